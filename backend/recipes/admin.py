@@ -1,5 +1,4 @@
 from django.contrib import admin
-from django.db.models import Count
 
 from .models import (
     FavoriteRecipe,
@@ -50,7 +49,7 @@ class IngredientInline(admin.TabularInline):
 class RecipeAdmin(admin.ModelAdmin):
     list_select_related = True
     inlines = (TagsInline, IngredientInline)
-    list_display = ('id', 'name', 'author', 'in_favorites')
+    list_display = ('id', 'name', 'author', 'favorites_count')
     list_display_links = ('name',)
     search_fields = (
         'name',
@@ -61,14 +60,6 @@ class RecipeAdmin(admin.ModelAdmin):
     )
     list_filter = ('tags',)
 
-    @admin.display()
-    def in_favorites(self, obj):
-        return obj.in_favorites
-
-    def get_queryset(self, request):
-        qs = super().get_queryset(request)
-        return qs.annotate(in_favorites=Count('in_favoriterecipe'))
-
 
 @admin.register(FavoriteRecipe, ShoppingCart)
 class BaseRecipeToUserAdmin(admin.ModelAdmin):
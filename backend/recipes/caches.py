@@ -0,0 +1,161 @@
+import hashlib
+import time
+
+from django.apps import apps
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+GENERATION_KEY = 'generation:{0}'
+# Generations of a single object, named '<namespace>:<id>', expire after
+# this long, which is longer than any value cached under them. Fixed
+# names ('tag', 'user', ...) are kept for good.
+OBJECT_GENERATION_TIMEOUT = 2 * 86400
+USER_RECIPE_IDS_KEY = 'user-recipe-ids:{0}:{1}:{2}'
+
+
+def is_cache_shared():
+    """
+    Whether the default cache is shared by all the processes. Otherwise
+    a generation bumped by one worker or management command is not seen
+    by the others, which keep serving their stale indexes and responses.
+    """
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def get_generation_timeout(name):
+    """
+    Return the timeout of the `name` generation. An expired generation
+    starts over from a new number, which only invalidates its values.
+    """
+    return OBJECT_GENERATION_TIMEOUT if ':' in name else None
+
+
+def get_generation(name):
+    """Return the current generation number of the `name` namespace."""
+    return cache.get_or_set(
+        GENERATION_KEY.format(name),
+        time.time_ns(),
+        timeout=get_generation_timeout(name),
+    )
+
+
+def bump_generation(name):
+    """
+    Move the `name` namespace to a new generation, so every value cached
+    under the previous one becomes unreachable.
+    """
+    key = GENERATION_KEY.format(name)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        generation = time.time_ns()
+        cache.set(key, generation, timeout=get_generation_timeout(name))
+        return generation
+
+
+class UserRecipeIds:
+    """
+    Cache of the ids of the recipes a user has in one of their lists.
+
+    Every user has a generation of their own, bumped when the list
+    changes, so a set loaded concurrently with a write never outlives it.
+    """
+
+    timeout = 86400
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+
+    def get(self, user):
+        """Return the frozenset of recipe ids in the list of `user`."""
+        if not user.is_authenticated:
+            return frozenset()
+        key = USER_RECIPE_IDS_KEY.format(
+            self.model_name,
+            user.id,
+            get_generation(self.generation_name(user.id)),
+        )
+        recipe_ids = cache.get(key)
+        if recipe_ids is None:
+            model = apps.get_model('recipes', self.model_name)
+            recipe_ids = frozenset(
+                model.objects.filter(user_id=user.id)
+                .order_by()
+                .values_list('recipe_id', flat=True)
+            )
+            cache.set(key, recipe_ids, self.timeout)
+        return recipe_ids
+
+    def invalidate(self, user_id):
+        bump_generation(self.generation_name(user_id))
+
+    def generation_name(self, user_id):
+        return f'{self.model_name}:{user_id}'
+
+
+favorite_recipe_ids = UserRecipeIds('FavoriteRecipe')
+cart_recipe_ids = UserRecipeIds('ShoppingCart')
+
+
+RECIPE_BODY_KEY = 'recipe-body:{0}:{1}'
+RECIPE_GENERATION = 'recipe:{0}'
+# Any recipe list: bumped by recipe edits and by favorites, which change
+# the counters shown and the `popular` ordering.
+RECIPES_GENERATION = 'recipes'
+USER_GENERATION = 'user:{0}'
+USERS_GENERATION = 'user'
+
+
+class RecipeBodies:
+    """
+    Cache of rendered recipes, shared by all the viewers.
+
+    Only `is_favorited`, `is_in_shopping_cart` and `author.is_subscribed`
+    depend on the viewer; they are stored as rendered for the first one
+    and must be overlaid for every response.
+
+    A body is stored together with the generations it was rendered under:
+    those of the recipe, of its author and of the tags and ingredients. It
+    is served only while all of them are still current, which takes a
+    single `get_many()` of the generations.
+    """
+
+    timeout = 86400
+
+    def get(self, recipe_id, base_url):
+        cached = cache.get(self._key(recipe_id, base_url))
+        if cached is None:
+            return None
+        generations, body = cached
+        current = cache.get_many(
+            [GENERATION_KEY.format(name) for name in generations]
+        )
+        for name, generation in generations.items():
+            if current.get(GENERATION_KEY.format(name)) != generation:
+                return None
+        return body
+
+    def set(self, recipe_id, base_url, generations, body):
+        cache.set(
+            self._key(recipe_id, base_url), (generations, body), self.timeout
+        )
+
+    @staticmethod
+    def get_generations(*names):
+        return {name: get_generation(name) for name in names}
+
+    @staticmethod
+    def generation_names(recipe_id):
+        """Names of the generations a body depends on, but the author's."""
+        return (RECIPE_GENERATION.format(recipe_id), 'tag', 'ingredient')
+
+    @staticmethod
+    def _key(recipe_id, base_url):
+        # Image URLs are absolute, so bodies are kept per host.
+        return RECIPE_BODY_KEY.format(
+            recipe_id, hashlib.md5(base_url.encode()).hexdigest()
+        )
+
+
+recipe_bodies = RecipeBodies()
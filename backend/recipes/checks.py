@@ -0,0 +1,21 @@
+from django.core import checks
+
+from .caches import is_cache_shared
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_cache_is_shared(app_configs, **kwargs):
+    if is_cache_shared():
+        return []
+    return [
+        checks.Warning(
+            'The default cache is local to each process.',
+            hint=(
+                'Cache invalidations made by one gunicorn worker or by a '
+                'management command are not seen by the other processes. '
+                'Set CACHE_BACKEND and CACHE_LOCATION to a shared backend, '
+                'e.g. Redis.'
+            ),
+            id='recipes.W001',
+        )
+    ]
@@ -0,0 +1,90 @@
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+
+from django.core.cache import cache
+
+from .caches import get_generation
+from users.models import Follow
+from users.paginations import KeysetPagination
+from users.signals import FOLLOW_GENERATION
+
+FEED_TIMELINE_KEY = 'feed-timeline:{0}:{1}'
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def filter_feed(queryset, user):
+    """Return the recipes of `queryset` written by authors `user` follows."""
+    return queryset.filter(
+        author_id__in=Follow.objects.filter(follower_id=user.id).values(
+            'follow_to_id'
+        )
+    )
+
+
+def get_sort_key(created_at, pk):
+    """Return the key sorting feed positions newest first, ascending."""
+    return -((created_at - EPOCH) // MICROSECOND), -pk
+
+
+class FeedTimeline:
+    """
+    Cached head of the feed of a user: `(created_at, id)` of the newest
+    `size` recipes of the followed authors.
+
+    The timeline is keyed by the follow generation of the user, so it is
+    rebuilt as soon as they follow or unfollow someone; new recipes of
+    the followed authors show up within `timeout` seconds.
+    """
+
+    size = 1000
+    timeout = 60
+
+    def get(self, queryset, user):
+        key = FEED_TIMELINE_KEY.format(
+            user.id, get_generation(FOLLOW_GENERATION.format(user.id))
+        )
+        timeline = cache.get(key)
+        if timeline is None:
+            timeline = list(
+                filter_feed(queryset, user)
+                .order_by('-created_at', '-id')
+                .values_list('created_at', 'id')[: self.size]
+            )
+            cache.set(key, timeline, self.timeout)
+        return timeline
+
+
+class FeedPagination(KeysetPagination):
+    """
+    Keyset pagination of the feed which serves the pages from the cached
+    timeline and queries the database only past its end.
+    """
+
+    timeline = FeedTimeline()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        position = self.decode_cursor(request, queryset.model)
+
+        timeline = self.timeline.get(queryset, request.user)
+        start = 0
+        if position is not None:
+            keys = [get_sort_key(*item) for item in timeline]
+            start = bisect_right(keys, get_sort_key(*position))
+        end = start + self.page_size + 1
+        page = timeline[start:end]
+        if len(page) <= self.page_size and len(timeline) >= self.timeline.size:
+            return super().paginate_queryset(
+                filter_feed(queryset, request.user), request, view
+            )
+
+        self.has_next = len(page) > self.page_size
+        page = page[: self.page_size]
+        self.next_position = None
+        if self.has_next:
+            created_at, pk = page[-1]
+            self.next_position = [str(created_at), str(pk)]
+        recipes = queryset.in_bulk([pk for _, pk in page])
+        return [recipes[pk] for _, pk in page if pk in recipes]
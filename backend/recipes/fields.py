@@ -14,3 +14,16 @@ class HEXColorField(models.CharField):
         if isinstance(value, str):
             return value.upper()
         return value
+
+
+class SearchVectorField(models.Field):
+    """
+    Stored `tsvector` column for PostgreSQL full-text search.
+
+    Other databases get a plain text column which is left empty.
+    """
+
+    def db_type(self, connection):
+        if connection.vendor == 'postgresql':
+            return 'tsvector'
+        return 'text'
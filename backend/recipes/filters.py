@@ -1,37 +1,141 @@
+from django.core.cache import cache
+from django.db.models import Exists, F, OuterRef
 from django_filters import rest_framework as filters
 
-from recipes.models import Tag, User
+from recipes.caches import (
+    cart_recipe_ids,
+    favorite_recipe_ids,
+    get_generation,
+)
+from recipes.indexes import recipe_ingredient_index
+from recipes.models import (
+    Ingredient,
+    RecipeIngredient,
+    RecipeTag,
+    Tag,
+    User,
+)
+from recipes.search import search_recipes
 
+TAG_IDS_KEY = 'tag-ids:{0}'
 
-class IngredientFilter(filters.FilterSet):
-    """FilterSet for IngredientViewSet."""
 
-    name = filters.CharFilter(lookup_expr='istartswith')
+def get_tag_ids_by_slug():
+    """Return the cached `{slug: id}` map of all tags."""
+    key = TAG_IDS_KEY.format(get_generation('tag'))
+    tag_ids = cache.get(key)
+    if tag_ids is None:
+        tag_ids = dict(Tag.objects.values_list('slug', 'id'))
+        cache.set(key, tag_ids, timeout=None)
+    return tag_ids
+
+
+def get_tag_choices():
+    return [(slug, slug) for slug in get_tag_ids_by_slug()]
+
+
+def uses_ingredients(ingredients):
+    """Condition on recipes using any of the `ingredients`."""
+    return Exists(
+        RecipeIngredient.objects.filter(
+            recipe_id=OuterRef('pk'), ingredient__in=ingredients
+        )
+    )
 
 
 class RecipeFilter(filters.FilterSet):
     """FilterSet for RecipeViewSet."""
 
+    # Larger sets of recipe ids matched by the ingredient index are not
+    # passed to the database, which checks the ingredients itself.
+    max_recipe_ids = 1000
+    orderings = {
+        'popular': ('-favorites_count', '-created_at', '-id'),
+        # Recipes not ranked yet, e.g. created since the last refresh of
+        # the rankings, come last.
+        'trending': (
+            F('ranking__trending_score').desc(nulls_last=True),
+            '-created_at',
+            '-id',
+        ),
+    }
+
     author = filters.ModelChoiceFilter(
         field_name='author_id',
         queryset=User.objects.all(),
     )
-    tags = filters.filters.ModelMultipleChoiceFilter(
-        queryset=Tag.objects.all(),
-        field_name='tags__slug',
-        to_field_name='slug',
+    tags = filters.MultipleChoiceFilter(
+        choices=get_tag_choices,
+        method='tags_filter',
     )
     is_favorited = filters.BooleanFilter(method='favorited_filter')
     is_in_shopping_cart = filters.BooleanFilter(method='shoppingcart_filter')
+    search = filters.CharFilter(method='search_filter')
+    ordering = filters.ChoiceFilter(
+        choices=[(name, name) for name in orderings],
+        method='ordering_filter',
+    )
+    ingredients = filters.ModelMultipleChoiceFilter(
+        queryset=Ingredient.objects.all(),
+        method='ingredients_filter',
+    )
+    exclude_ingredients = filters.ModelMultipleChoiceFilter(
+        queryset=Ingredient.objects.all(),
+        method='exclude_ingredients_filter',
+    )
+
+    def tags_filter(self, queryset, name, value):
+        tag_ids = get_tag_ids_by_slug()
+        recipe_tags = RecipeTag.objects.filter(
+            recipe_id=OuterRef('pk'),
+            tag_id__in=[tag_ids[slug] for slug in value],
+        )
+        return queryset.filter(Exists(recipe_tags))
+
+    def ingredients_filter(self, queryset, name, value):
+        if not value:
+            return queryset
+        excluded = self.form.cleaned_data.get('exclude_ingredients')
+        recipe_ids = recipe_ingredient_index.with_all(
+            ingredient.id for ingredient in value
+        )
+        if excluded:
+            recipe_ids -= recipe_ingredient_index.with_any(
+                ingredient.id for ingredient in excluded
+            )
+        if len(recipe_ids) <= self.max_recipe_ids:
+            return queryset.filter(id__in=recipe_ids)
+        for ingredient in value:
+            queryset = queryset.filter(uses_ingredients([ingredient]))
+        if excluded:
+            queryset = queryset.exclude(uses_ingredients(excluded))
+        return queryset
+
+    def exclude_ingredients_filter(self, queryset, name, value):
+        if not value or self.form.cleaned_data.get('ingredients'):
+            # Already subtracted from the ids by `ingredients_filter`.
+            return queryset
+        recipe_ids = recipe_ingredient_index.with_any(
+            ingredient.id for ingredient in value
+        )
+        if len(recipe_ids) <= self.max_recipe_ids:
+            return queryset.exclude(id__in=recipe_ids)
+        return queryset.exclude(uses_ingredients(value))
+
+    def ordering_filter(self, queryset, name, value):
+        return queryset.order_by(*self.orderings[value])
+
+    def search_filter(self, queryset, name, value):
+        return search_recipes(queryset, value)
 
     def shoppingcart_filter(self, queryset, name, value):
         user = self.request.user
         if value is True and user.is_authenticated:
-            return queryset.filter(in_shoppingcart__user_id=user.id)
+            return queryset.filter(id__in=cart_recipe_ids.get(user))
         return queryset
 
     def favorited_filter(self, queryset, name, value):
         user = self.request.user
         if value is True and user.is_authenticated:
-            return queryset.filter(in_favoriterecipe__user_id=user.id)
+            return queryset.filter(id__in=favorite_recipe_ids.get(user))
         return queryset
@@ -0,0 +1,167 @@
+import hashlib
+import io
+import logging
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import PurePosixPath
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections
+from django.utils.module_loading import import_string
+from PIL import Image, ImageOps
+
+from .caches import RECIPE_GENERATION, RECIPES_GENERATION, bump_generation
+
+logger = logging.getLogger(__name__)
+app_config = apps.get_app_config('recipes')
+
+ImageVariant = namedtuple('ImageVariant', ('size', 'format', 'extension'))
+
+IMAGE_VARIANTS = {
+    'thumbnail': ImageVariant((480, 480), 'JPEG', 'jpg'),
+    'medium': ImageVariant((1280, 1280), 'JPEG', 'jpg'),
+    'webp': ImageVariant((1280, 1280), 'WEBP', 'webp'),
+}
+IMAGE_SAVE_OPTIONS = {
+    'JPEG': {'quality': 85, 'optimize': True, 'progressive': True},
+    'WEBP': {'quality': 80, 'method': 4},
+}
+
+
+class SyncImagePipeline:
+    """Process images in the calling thread. Meant for tests."""
+
+    def submit(self, func, *args):
+        func(*args)
+
+
+class ThreadPoolImagePipeline:
+    """Process images in a pool of background threads of the worker."""
+
+    def __init__(self, max_workers=2):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='recipe-images'
+        )
+
+    def submit(self, func, *args):
+        self._executor.submit(self._run, func, *args)
+
+    @staticmethod
+    def _run(func, *args):
+        try:
+            func(*args)
+        except Exception:
+            logger.exception('Image processing job %r failed.', args)
+        finally:
+            close_old_connections()
+
+
+@lru_cache(maxsize=None)
+def get_image_pipeline():
+    config = settings.RECIPE_IMAGE_PIPELINE
+    pipeline_class = import_string(config['BACKEND'])
+    return pipeline_class(**config.get('OPTIONS', {}))
+
+
+def enqueue_image_processing(recipe_id, image_name):
+    get_image_pipeline().submit(process_recipe_image, recipe_id, image_name)
+
+
+def process_recipe_image(recipe_id, image_name):
+    """
+    Generate the variants of the recipe image and attach them to the
+    recipe, unless the image has been replaced in the meantime.
+    """
+    Recipe = app_config.get_model('Recipe')
+    storage = Recipe._meta.get_field('image').storage
+
+    variants = generate_variants(storage, image_name)
+    updated = Recipe.objects.filter(pk=recipe_id, image=image_name).update(
+        image_variants=variants
+    )
+    if not updated:
+        delete_variants(storage, variants)
+        return None
+    # The update bypasses `post_save`, so the cached body of the recipe
+    # and the cached lists are invalidated here.
+    bump_generation(RECIPE_GENERATION.format(recipe_id))
+    bump_generation(RECIPES_GENERATION)
+    return variants
+
+
+def generate_variants(storage, image_name):
+    """
+    Return the variants of the image, generating the missing ones.
+
+    Variant file names are derived from a hash of the image name and
+    content, so a variant which is already on disk was rendered from this
+    very file and is reused rather than rendered again, while images with
+    the same file name (in other directories, or of another format) get
+    variants of their own.
+    """
+    with storage.open(image_name) as file:
+        content = file.read()
+    digest = get_image_digest(image_name, content)
+    stem = PurePosixPath(image_name).stem
+    original = None
+    variants = {}
+    for variant_name, variant in IMAGE_VARIANTS.items():
+        name = f'variants/{variant_name}/{stem}-{digest}.{variant.extension}'
+        if storage.exists(name):
+            with storage.open(name) as file, Image.open(file) as image:
+                width, height = image.size
+        else:
+            if original is None:
+                original = _open_original(content)
+            image = _render_variant(original, variant)
+            width, height = image.size
+
+            buffer = io.BytesIO()
+            options = IMAGE_SAVE_OPTIONS[variant.format]
+            image.save(buffer, variant.format, **options)
+            name = storage.save(name, ContentFile(buffer.getvalue()))
+        variants[variant_name] = {
+            'name': name,
+            'width': width,
+            'height': height,
+        }
+    return variants
+
+
+def get_image_digest(image_name, content):
+    digest = hashlib.sha256(image_name.encode())
+    digest.update(b'\0')
+    digest.update(content)
+    return digest.hexdigest()[:16]
+
+
+def delete_variants(storage, variants):
+    for variant in variants.values():
+        storage.delete(variant['name'])
+
+
+def _open_original(content):
+    with Image.open(io.BytesIO(content)) as image:
+        return ImageOps.exif_transpose(image)
+
+
+def _render_variant(original, variant):
+    image = _convert_for_format(original, variant.format)
+    image.thumbnail(variant.size, Image.Resampling.LANCZOS)
+    return image
+
+
+def _convert_for_format(image, image_format):
+    if image_format != 'JPEG':
+        if image.mode in ('RGB', 'RGBA'):
+            return image.copy()
+        return image.convert('RGBA')
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
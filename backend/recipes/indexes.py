@@ -0,0 +1,336 @@
+import re
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict, namedtuple
+
+from django.core.cache import cache
+
+from .caches import bump_generation, get_generation
+from .models import Ingredient, Recipe, RecipeIngredient
+
+MAX_CHAR = chr(0x10FFFF)
+WORD_RE = re.compile(r'\w+')
+
+_IngredientSnapshot = namedtuple(
+    '_IngredientSnapshot', ('generation', 'keys', 'items', 'by_id')
+)
+_RecipeSearchSnapshot = namedtuple(
+    '_RecipeSearchSnapshot', ('generation', 'tokens', 'postings')
+)
+_RecipeIngredientSnapshot = namedtuple(
+    '_RecipeIngredientSnapshot', ('generation', 'postings', 'ingredients')
+)
+
+
+def prefix_range(keys, prefix):
+    """Return the bounds of the `keys` starting with `prefix`."""
+    start = bisect_left(keys, prefix)
+    return start, bisect_left(keys, prefix + MAX_CHAR, lo=start)
+
+
+class GenerationIndex:
+    """
+    Base class of in-process indexes rebuilt lazily, once per worker,
+    whenever the `generation_name` cache generation changes.
+
+    Indexes may instead update their snapshot in `_refresh()`:
+    `record_change()` bumps the generation and stores the changed key
+    under the new one, so that a worker a few generations behind gets
+    the keys changed since its snapshot from `_get_changes()`.
+    """
+
+    generation_name = None
+    change_key = 'index-change:{0}:{1}'
+    change_timeout = 3600
+    max_changes = 1000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    def invalidate(self):
+        bump_generation(self.generation_name)
+
+    def record_change(self, key):
+        generation = bump_generation(self.generation_name)
+        cache.set(
+            self.change_key.format(self.generation_name, generation),
+            key,
+            self.change_timeout,
+        )
+
+    def _get_snapshot(self):
+        generation = get_generation(self.generation_name)
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.generation != generation:
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot is None or snapshot.generation != generation:
+                    snapshot = self._snapshot = self._refresh(
+                        snapshot, generation
+                    )
+        return snapshot
+
+    def _refresh(self, snapshot, generation):
+        """Return the snapshot of `generation`, replacing `snapshot`."""
+        return self._build(generation)
+
+    def _get_changes(self, snapshot, generation):
+        """
+        Return the set of keys changed since `snapshot`, or `None` if the
+        index has to be rebuilt: the generation moved by `invalidate()`,
+        too far, or some of the changes have expired.
+        """
+        if (
+            snapshot is None
+            or not 0 < generation - snapshot.generation <= self.max_changes
+        ):
+            return None
+        keys = [
+            self.change_key.format(self.generation_name, number)
+            for number in range(snapshot.generation + 1, generation + 1)
+        ]
+        changes = cache.get_many(keys)
+        if len(changes) != len(keys):
+            return None
+        return set(changes.values())
+
+    def _build(self, generation):
+        raise NotImplementedError
+
+
+class IngredientIndex(GenerationIndex):
+    """
+    In-process prefix index of the ingredient catalog.
+
+    Ingredients are kept sorted by casefolded name, so a prefix search is
+    two binary searches.
+    """
+
+    generation_name = 'ingredient'
+
+    def search(self, prefix=''):
+        """Return ingredients whose name starts with `prefix`."""
+        snapshot = self._get_snapshot()
+        if not prefix:
+            return snapshot.items
+        start, end = prefix_range(snapshot.keys, prefix.casefold())
+        return snapshot.items[start:end]
+
+    def get(self, pk):
+        """Return the ingredient with the given `pk` or `None`."""
+        return self._get_snapshot().by_id.get(pk)
+
+    def _build(self, generation):
+        rows = Ingredient.objects.order_by().values_list(
+            'id', 'name', 'measurement_unit__name'
+        )
+        items = sorted(
+            (
+                {'id': pk, 'name': name, 'measurement_unit': unit}
+                for pk, name, unit in rows
+            ),
+            key=lambda item: (item['name'].casefold(), item['id']),
+        )
+        return _IngredientSnapshot(
+            generation=generation,
+            keys=[item['name'].casefold() for item in items],
+            items=items,
+            by_id={item['id']: item for item in items},
+        )
+
+
+class RecipeSearchIndex(GenerationIndex):
+    """
+    In-process inverted index of recipe names and texts.
+
+    Serves recipe search on databases without full-text search. Every
+    word of the query has to match the beginning of a word of the recipe;
+    words of the name weigh more than words of the text.
+    """
+
+    generation_name = 'recipe'
+    name_weight = 2
+    text_weight = 1
+
+    def search(self, text):
+        """Return the ids of the matching recipes, most relevant first."""
+        scores = self.score(text)
+        return sorted(scores, key=lambda pk: (-scores[pk], -pk))
+
+    def score(self, text):
+        """Return the `{recipe_id: score}` map of the matching recipes."""
+        terms = WORD_RE.findall(text.casefold())
+        if not terms:
+            return {}
+        snapshot = self._get_snapshot()
+        scores = None
+        for term in terms:
+            term_scores = Counter()
+            start, end = prefix_range(snapshot.tokens, term)
+            for token in snapshot.tokens[start:end]:
+                term_scores.update(snapshot.postings[token])
+            if scores is not None:
+                term_scores = Counter(
+                    {
+                        pk: scores[pk] + score
+                        for pk, score in term_scores.items()
+                        if pk in scores
+                    }
+                )
+            scores = term_scores
+            if not scores:
+                return {}
+        return scores
+
+    def _build(self, generation):
+        postings = defaultdict(Counter)
+        rows = Recipe.objects.order_by().values_list('id', 'name', 'text')
+        for pk, name, text in rows:
+            for token in WORD_RE.findall(name.casefold()):
+                postings[token][pk] += self.name_weight
+            for token in WORD_RE.findall(text.casefold()):
+                postings[token][pk] += self.text_weight
+        return _RecipeSearchSnapshot(
+            generation=generation,
+            tokens=sorted(postings),
+            postings=dict(postings),
+        )
+
+
+class RecipeIngredientIndex(GenerationIndex):
+    """
+    In-process inverted index from ingredients to the recipes using them.
+
+    The recipes of every ingredient are kept as a compact array of ids,
+    and the ingredients of every recipe as an array in a dict by recipe
+    id. Recipe writes are recorded as changes of their recipe, so workers
+    re-read the ingredients of the changed recipes only.
+    """
+
+    generation_name = 'recipe-ingredients'
+
+    def with_all(self, ingredient_ids):
+        """Return the set of ids of recipes using every ingredient."""
+        postings = self._get_postings(ingredient_ids)
+        if not postings:
+            return set()
+        postings.sort(key=len)
+        recipe_ids = set(postings[0])
+        for recipe_ids_of_ingredient in postings[1:]:
+            recipe_ids.intersection_update(recipe_ids_of_ingredient)
+        return recipe_ids
+
+    def with_any(self, ingredient_ids):
+        """Return the set of ids of recipes using any of the ingredients."""
+        recipe_ids = set()
+        for recipe_ids_of_ingredient in self._get_postings(ingredient_ids):
+            recipe_ids.update(recipe_ids_of_ingredient)
+        return recipe_ids
+
+    def rank(self, ingredient_ids):
+        """
+        Return `(recipe_id, coverage)` pairs of the recipes using any of
+        the ingredients, where coverage is the share of the recipe
+        ingredients found among them. Best covered recipes come first.
+        """
+        snapshot = self._get_snapshot()
+        matches = Counter()
+        for recipe_ids in self._get_postings(set(ingredient_ids), snapshot):
+            matches.update(recipe_ids)
+        sizes = {
+            recipe_id: len(snapshot.ingredients[recipe_id])
+            for recipe_id in matches
+        }
+        ranked = sorted(
+            matches.items(),
+            key=lambda item: (
+                -item[1] / sizes[item[0]],
+                -item[1],
+                -item[0],
+            ),
+        )
+        return [
+            (recipe_id, matched / sizes[recipe_id])
+            for recipe_id, matched in ranked
+        ]
+
+    def _get_postings(self, ingredient_ids, snapshot=None):
+        if snapshot is None:
+            snapshot = self._get_snapshot()
+        return [
+            snapshot.postings.get(ingredient_id, ())
+            for ingredient_id in ingredient_ids
+        ]
+
+    def _refresh(self, snapshot, generation):
+        recipe_ids = self._get_changes(snapshot, generation)
+        if recipe_ids is None:
+            return self._build(generation)
+        return self._apply_changes(snapshot, generation, recipe_ids)
+
+    def _build(self, generation):
+        postings = defaultdict(lambda: array('Q'))
+        ingredients = defaultdict(lambda: array('Q'))
+        rows = RecipeIngredient.objects.order_by().values_list(
+            'ingredient_id', 'recipe_id'
+        )
+        for ingredient_id, recipe_id in rows.iterator(chunk_size=10000):
+            postings[ingredient_id].append(recipe_id)
+            ingredients[recipe_id].append(ingredient_id)
+        return _RecipeIngredientSnapshot(
+            generation=generation,
+            postings=dict(postings),
+            ingredients=dict(ingredients),
+        )
+
+    def _apply_changes(self, snapshot, generation, recipe_ids):
+        """
+        Return a copy of `snapshot` with the current ingredients of the
+        changed recipes. Only the arrays of their old and new ingredients
+        are rebuilt; the others are shared with `snapshot`.
+        """
+        changed = {recipe_id: array('Q') for recipe_id in recipe_ids}
+        rows = RecipeIngredient.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('recipe_id', 'ingredient_id')
+        for recipe_id, ingredient_id in rows:
+            changed[recipe_id].append(ingredient_id)
+
+        ingredients = dict(snapshot.ingredients)
+        added = defaultdict(list)
+        affected = set()
+        for recipe_id, ingredient_ids in changed.items():
+            affected.update(ingredients.pop(recipe_id, ()))
+            if ingredient_ids:
+                ingredients[recipe_id] = ingredient_ids
+            for ingredient_id in ingredient_ids:
+                added[ingredient_id].append(recipe_id)
+        affected.update(added)
+
+        postings = dict(snapshot.postings)
+        for ingredient_id in affected:
+            recipe_ids_of_ingredient = array(
+                'Q',
+                (
+                    recipe_id
+                    for recipe_id in postings.get(ingredient_id, ())
+                    if recipe_id not in changed
+                ),
+            )
+            recipe_ids_of_ingredient.extend(added.get(ingredient_id, ()))
+            if recipe_ids_of_ingredient:
+                postings[ingredient_id] = recipe_ids_of_ingredient
+            else:
+                postings.pop(ingredient_id, None)
+        return _RecipeIngredientSnapshot(
+            generation=generation,
+            postings=postings,
+            ingredients=ingredients,
+        )
+
+
+ingredient_index = IngredientIndex()
+recipe_search_index = RecipeSearchIndex()
+recipe_ingredient_index = RecipeIngredientIndex()
@@ -0,0 +1,60 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from recipes.images import IMAGE_VARIANTS, process_recipe_image
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Generate missing image variants of existing recipes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Number of images processed in parallel.',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Process every recipe, not only the ones missing variants.',
+        )
+
+    def handle(self, *args, **options):
+        queryset = Recipe.objects.order_by('pk')
+        if not options['all']:
+            queryset = queryset.exclude(
+                image_variants__has_keys=list(IMAGE_VARIANTS)
+            )
+        recipes = list(queryset.values_list('pk', 'image'))
+
+        processed = failed = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            futures = {
+                executor.submit(self._process, pk, image_name): pk
+                for pk, image_name in recipes
+            }
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f'Recipe {futures[future]}: {exc}')
+                else:
+                    processed += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Processed {processed} recipe images, {failed} failed.'
+            )
+        )
+
+    @staticmethod
+    def _process(pk, image_name):
+        try:
+            process_recipe_image(pk, image_name)
+        finally:
+            close_old_connections()
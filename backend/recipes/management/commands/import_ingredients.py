@@ -0,0 +1,189 @@
+import csv
+import json
+import re
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.caches import is_cache_shared
+from recipes.indexes import ingredient_index
+from recipes.models import Ingredient, MeasurementUnit
+
+JSON_CHUNK_SIZE = 1 << 16
+CSV_HEADER = ('name', 'measurement_unit')
+SEPARATORS = re.compile(r'[\s,]*')
+NAME_MAX_LENGTH = Ingredient._meta.get_field('name').max_length
+UNIT_MAX_LENGTH = MeasurementUnit._meta.get_field('name').max_length
+
+
+def iter_json_array(file, chunk_size=JSON_CHUNK_SIZE):
+    """
+    Yield the items of the top-level JSON array of `file`, reading it in
+    chunks, so that only one item is held in memory at a time.
+    """
+    decoder = json.JSONDecoder()
+    buffer = file.read(chunk_size).lstrip('\ufeff \t\r\n')
+    if not buffer.startswith('['):
+        raise CommandError('The JSON input must be an array.')
+    position = 1
+    while True:
+        position = SEPARATORS.match(buffer, position).end()
+        if buffer.startswith(']', position):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                raise CommandError('The JSON input is truncated or invalid.')
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        if end == len(buffer):
+            # A number may go on in the next chunk.
+            chunk = file.read(chunk_size)
+            if chunk:
+                buffer, position = buffer[position:] + chunk, 0
+                continue
+        yield item
+        position = end
+
+
+def iter_json_rows(file):
+    """
+    Yield `(name, measurement_unit)` pairs of a JSON array of ingredients,
+    either plain objects or objects in the fixtures format. The unit is
+    given by its name, or by its pk in the fixtures.
+    """
+    for item in iter_json_array(file):
+        if not isinstance(item, dict):
+            yield None, None
+            continue
+        item = item.get('fields', item)
+        yield item.get('name'), item.get('measurement_unit')
+
+
+def iter_csv_rows(file):
+    """Yield `(name, measurement_unit)` pairs of CSV rows."""
+    for line_number, row in enumerate(csv.reader(file), start=1):
+        if line_number == 1 and tuple(row) == CSV_HEADER:
+            continue
+        if len(row) != 2:
+            yield None, None
+            continue
+        yield row[0], row[1]
+
+
+class Command(BaseCommand):
+    help = 'Import ingredients from a JSON or CSV file.'
+
+    readers = {'json': iter_json_rows, 'csv': iter_csv_rows}
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to the JSON or CSV file.')
+        parser.add_argument(
+            '--format',
+            choices=sorted(self.readers),
+            help='Input format, guessed from the file extension by default.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Number of ingredients written per query.',
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        input_format = options['format'] or path.suffix.lstrip('.').lower()
+        if input_format not in self.readers:
+            raise CommandError(
+                f'Unknown format of "{path}", pass it with --format.'
+            )
+
+        started = time.monotonic()
+        ingredients_before = Ingredient.objects.count()
+        with path.open(encoding='utf-8', newline='') as file:
+            rows = self.readers[input_format](file)
+            read, skipped = self._import(rows, options['batch_size'])
+        ingredient_index.invalidate()
+
+        elapsed = time.monotonic() - started
+        created = Ingredient.objects.count() - ingredients_before
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Imported {read} rows ({created} new ingredients, '
+                f'{skipped} invalid rows skipped) in {elapsed:.1f} s, '
+                f'{read / max(elapsed, 1e-9):.0f} rows/s.'
+            )
+        )
+        if not is_cache_shared():
+            self.stdout.write(
+                self.style.WARNING(
+                    'The default cache is local to each process, so the '
+                    'running servers keep their ingredient index until '
+                    'they restart. See `manage.py check --deploy`.'
+                )
+            )
+
+    def _import(self, rows, batch_size):
+        unit_ids = dict(MeasurementUnit.objects.values_list('name', 'id'))
+        # Fixtures refer to the existing units by their pk.
+        unit_names = {pk: name for name, pk in unit_ids.items()}
+        read = skipped = 0
+        rows = iter(rows)
+        while batch := list(islice(rows, batch_size)):
+            read += len(batch)
+            ingredients = {}
+            for name, unit in batch:
+                if isinstance(unit, int):
+                    unit = unit_names.get(unit)
+                cleaned = self._clean(name, unit)
+                if cleaned is None:
+                    skipped += 1
+                    continue
+                ingredients[cleaned] = None
+            with transaction.atomic():
+                self._resolve_units(
+                    {unit for _, unit in ingredients}, unit_ids
+                )
+                Ingredient.objects.bulk_create(
+                    [
+                        Ingredient(
+                            name=name, measurement_unit_id=unit_ids[unit]
+                        )
+                        for name, unit in ingredients
+                    ],
+                    ignore_conflicts=True,
+                )
+        return read, skipped
+
+    @staticmethod
+    def _clean(name, unit):
+        if not isinstance(name, str) or not isinstance(unit, str):
+            return None
+        name, unit = name.strip(), unit.strip()
+        if not (
+            0 < len(name) <= NAME_MAX_LENGTH
+            and 0 < len(unit) <= UNIT_MAX_LENGTH
+        ):
+            return None
+        return name, unit
+
+    @staticmethod
+    def _resolve_units(names, unit_ids):
+        """Create the missing units and add their ids to `unit_ids`."""
+        missing = names - unit_ids.keys()
+        if not missing:
+            return
+        MeasurementUnit.objects.bulk_create(
+            [MeasurementUnit(name=name) for name in missing],
+            ignore_conflicts=True,
+        )
+        unit_ids.update(
+            MeasurementUnit.objects.filter(name__in=missing).values_list(
+                'name', 'id'
+            )
+        )
@@ -0,0 +1,70 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import FavoriteRecipe, Recipe
+from users.models import Follow
+
+User = get_user_model()
+
+
+def count_related(model, field_name):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field_name: OuterRef('pk')})
+            .order_by()
+            .values(field_name)
+            .annotate(count=Count('pk'))
+            .values('count')
+        ),
+        0,
+    )
+
+
+class Command(BaseCommand):
+    help = 'Recompute denormalized counters which have drifted.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of rows checked per UPDATE.',
+        )
+
+    def handle(self, *args, **options):
+        counters = (
+            (Recipe, 'favorites_count', FavoriteRecipe, 'recipe_id'),
+            (User, 'recipes_count', Recipe, 'author_id'),
+            (User, 'followers_count', Follow, 'follow_to_id'),
+        )
+        for model, field_name, related_model, related_field in counters:
+            fixed = self._recount(
+                model,
+                field_name,
+                count_related(related_model, related_field),
+                options['batch_size'],
+            )
+            self.stdout.write(
+                f'{model.__name__}.{field_name}: fixed {fixed} rows.'
+            )
+        self.stdout.write(self.style.SUCCESS('Counters are up to date.'))
+
+    @staticmethod
+    def _recount(model, field_name, expression, batch_size):
+        """Update the rows whose counter differs, one pk range at a time."""
+        fixed = 0
+        pks = model.objects.order_by('pk').values_list('pk', flat=True)
+        last_pk = None
+        while True:
+            batch = pks if last_pk is None else pks.filter(pk__gt=last_pk)
+            batch = list(batch[:batch_size])
+            if not batch:
+                return fixed
+            last_pk = batch[-1]
+            fixed += (
+                model.objects.filter(pk__gte=batch[0], pk__lte=last_pk)
+                .exclude(**{field_name: expression})
+                .update(**{field_name: expression})
+            )
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from recipes.rankings import refresh_rankings
+
+
+class Command(BaseCommand):
+    help = 'Refresh the rankings of recipes with new favorites and carts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Recompute every ranking, not only those with new events.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of rankings written per query.',
+        )
+
+    def handle(self, *args, **options):
+        count = refresh_rankings(
+            full=options['full'], batch_size=options['batch_size']
+        )
+        self.stdout.write(self.style.SUCCESS(f'Refreshed {count} rankings.'))
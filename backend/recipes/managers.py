@@ -1,37 +1,55 @@
 from django.apps import apps
 from django.contrib.auth import get_user_model
 from django.db import models
-from django.db.models import Exists, OuterRef, Prefetch
+from django.db.models import F, Prefetch, Window
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
 
 User = get_user_model()
 app_config = apps.get_app_config('recipes')
 
 
 class RecipeManager(models.Manager):
+    def get_queryset(self):
+        # The search vector is filled by the database and only read by it.
+        return super().get_queryset().defer('search_vector')
+
     def setup_eager_loading(self, user):
         RecipeIngredient = app_config.get_model('RecipeIngredient')
-        FavoriteRecipe = app_config.get_model('FavoriteRecipe')
-        ShoppingCart = app_config.get_model('ShoppingCart')
 
         author_qs = User.objects.is_subscribed(user)
         ingredients_qs = RecipeIngredient.objects.select_related(
             'ingredient__measurement_unit'
         )
 
-        queryset = self.prefetch_related(
+        return self.prefetch_related(
             'tags',
             Prefetch('author', queryset=author_qs),
             Prefetch('recipe_ingredients', queryset=ingredients_qs),
-        ).annotate(
-            in_favorite_recipe=Exists(
-                FavoriteRecipe.objects.filter(
-                    recipe_id=OuterRef('pk'), user_id=user.id
-                ),
-            ),
-            in_shopping_cart=Exists(
-                ShoppingCart.objects.filter(
-                    recipe_id=OuterRef('pk'), user_id=user.id
+        )
+
+    def limit_per_author(self, limit, author_ids):
+        """
+        Return a queryset of at most `limit` latest recipes of each of the
+        given authors, picked with `ROW_NUMBER() OVER (PARTITION BY author)`.
+        """
+        windowed = (
+            self.filter(author_id__in=author_ids)
+            .annotate(
+                row_number=Window(
+                    expression=RowNumber(),
+                    partition_by=F('author_id'),
+                    order_by=(F('created_at').desc(), F('pk').desc()),
                 ),
-            ),
+            )
+            .order_by()
+            .values('pk', 'row_number')
+        )
+        sql, params = windowed.query.sql_with_params()
+        return self.filter(
+            pk__in=RawSQL(
+                f'SELECT "id" FROM ({sql}) AS "windowed" '
+                'WHERE "row_number" <= %s',
+                (*params, limit),
+            )
         )
-        return queryset
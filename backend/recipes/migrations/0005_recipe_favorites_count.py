@@ -0,0 +1,34 @@
+# Generated by Django 4.1.1 on 2026-10-18 18:13
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_favorites(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    FavoriteRecipe = apps.get_model('recipes', 'FavoriteRecipe')
+    favorites = (
+        FavoriteRecipe.objects.filter(recipe_id=OuterRef('pk'))
+        .order_by()
+        .values('recipe_id')
+        .annotate(count=Count('pk'))
+        .values('count')
+    )
+    Recipe.objects.update(favorites_count=Coalesce(Subquery(favorites), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(count_favorites, migrations.RunPython.noop),
+    ]
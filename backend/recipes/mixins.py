@@ -1,51 +1,266 @@
-from django.http import Http404
+import hashlib
+import time
+from functools import partial
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.db import transaction
+from django.http import Http404, HttpResponse, HttpResponseNotModified
 from django.shortcuts import get_object_or_404
-from rest_framework import exceptions, generics, mixins, permissions
+from django.utils.http import parse_etags
+from rest_framework import exceptions, generics, permissions, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
 
+from recipes.caches import RECIPES_GENERATION, bump_generation, get_generation
 from recipes.models import Recipe
+from users.services import delete_matching, insert_or_ignore, update_counter
+
+
+class CachedResponseMixin:
+    """
+    Cache the rendered JSON of `list`/`retrieve` responses.
+
+    Responses are stored under the current generations of
+    `cache_generation` (a name or a tuple of names), so bumping any of
+    them invalidates all of them at once. Cached responses carry a strong
+    ETag and honour `If-None-Match`.
+
+    A missing response is rendered by a single request at a time: the
+    others wait for it up to `response_cache_lock_timeout` seconds instead
+    of all hitting the database after an invalidation.
+    """
+
+    cache_generation = None
+    cache_query_params = None
+    response_cache_timeout = 60 * 60 * 24
+    response_cache_lock_timeout = 10
+    response_cache_poll_interval = 0.05
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def should_cache_response(self, request):
+        return isinstance(request.accepted_renderer, JSONRenderer)
 
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        if not self.should_cache_response(request):
+            return handler(request, *args, **kwargs)
 
-class BaseRecipeToUserView(
-    mixins.CreateModelMixin, mixins.DestroyModelMixin, generics.GenericAPIView
-):
-    """Base view for "recipe + user" model"""
+        key = self.get_response_cache_key(request)
+        cached = cache.get(key)
+        if cached is None:
+            lock_key = f'{key}:lock'
+            locked = cache.add(lock_key, 1, self.response_cache_lock_timeout)
+            if not locked:
+                cached = self.wait_for_response(key)
+        if cached is None:
+            try:
+                response = handler(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                cached = self.render_response(request, response)
+                cache.set(key, cached, self.response_cache_timeout)
+            finally:
+                if locked:
+                    cache.delete(lock_key)
+
+        content, etag = cached
+        if self.etag_matches(request, etag):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(
+                content, content_type=request.accepted_media_type
+            )
+        response['ETag'] = etag
+        return response
+
+    def wait_for_response(self, key):
+        """
+        Wait while another request renders the response stored under
+        `key` and return it, or `None` if it failed to or took longer than
+        the lock timeout.
+        """
+        lock_key = f'{key}:lock'
+        deadline = time.monotonic() + self.response_cache_lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.response_cache_poll_interval)
+            cached = cache.get(key)
+            if cached is not None or cache.get(lock_key) is None:
+                return cached
+        return None
+
+    def render_response(self, request, response):
+        content = request.accepted_renderer.render(
+            response.data,
+            request.accepted_media_type,
+            self.get_renderer_context(),
+        )
+        etag = '"{0}"'.format(hashlib.md5(content).hexdigest())
+        return content, etag
+
+    def get_response_cache_key(self, request):
+        assert self.cache_generation is not None, (
+            f"'{self.__class__.__name__}' should include "
+            "a `cache_generation` attribute."
+        )
+        names = self.cache_generation
+        if isinstance(names, str):
+            names = (names,)
+        # Rendered URLs are absolute, so the host makes part of the key.
+        signature = '\n'.join(
+            (
+                request.build_absolute_uri('/'),
+                request.path,
+                self.get_cache_query_string(request),
+                request.accepted_media_type,
+            )
+        )
+        return 'response:{0}:{1}:{2}'.format(
+            ','.join(names),
+            ','.join(str(get_generation(name)) for name in names),
+            hashlib.md5(signature.encode()).hexdigest(),
+        )
+
+    def get_cache_query_string(self, request):
+        """
+        Return the query string normalized for the cache key: parameters
+        and their values are sorted and, when `cache_query_params` is set,
+        the other parameters are dropped.
+        """
+        params = self.get_cache_query_params()
+        return urlencode(
+            sorted(
+                (name, sorted(values))
+                for name, values in request.query_params.lists()
+                if params is None or name in params
+            ),
+            doseq=True,
+        )
+
+    def get_cache_query_params(self):
+        return self.cache_query_params
+
+    @staticmethod
+    def etag_matches(request, etag):
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if not if_none_match:
+            return False
+        etags = [tag.removeprefix('W/') for tag in parse_etags(if_none_match)]
+        return '*' in etags or etag in etags
+
+
+class AnonymousCachedResponseMixin(CachedResponseMixin):
+    """
+    `CachedResponseMixin` for views whose responses depend on the user:
+    only the responses to anonymous users are cached, and for a short
+    time, since they also show data (such as the authors' counters) whose
+    changes do not bump any generation.
+
+    Only the filter and pagination parameters make part of the cache key,
+    so arbitrary parameters cannot be used to bypass the cache.
+    """
+
+    response_cache_timeout = 60
+
+    def should_cache_response(self, request):
+        return (
+            super().should_cache_response(request)
+            and request.user.is_anonymous
+        )
+
+    def get_cache_query_params(self):
+        if self.cache_query_params is not None:
+            return self.cache_query_params
+        params = set()
+        filterset_class = getattr(self, 'filterset_class', None)
+        if filterset_class is not None:
+            params.update(filterset_class.base_filters)
+        paginator = self.paginator
+        for name in (
+            'page_query_param',
+            'page_size_query_param',
+            'cursor_query_param',
+        ):
+            if getattr(paginator, name, None):
+                params.add(getattr(paginator, name))
+        return params
+
+
+class BaseRecipeToUserView(generics.GenericAPIView):
+    """
+    Base view for "recipe + user" model.
+
+    Adding is a single `INSERT ... ON CONFLICT DO NOTHING` and removing
+    a single `DELETE`; the affected row count tells whether the recipe was
+    already (or not) in the list. The statements send no signals, so the
+    view updates `counter_field` and `user_recipe_ids` itself.
+    """
 
     permission_classes = (permissions.IsAuthenticated,)
-    lookup_field = 'recipe_id'
     error_messages = {'not_in': 'The recipe does not exist in your {0}.'}
     list_name = None
+    counter_field = None
+    user_recipe_ids = None
 
     def post(self, request, *args, **kwargs):
-        request.data['recipe'] = kwargs['recipe_id']
         return self.create(request, *args, **kwargs)
 
     def delete(self, request, *args, **kwargs):
         return self.destroy(request, *args, **kwargs)
 
     def create(self, request, *args, **kwargs):
-        get_object_or_404(Recipe, pk=kwargs['recipe_id'])
-        return super().create(request, *args, **kwargs)
-
-    def get_queryset(self):
-        qs = super().get_queryset()
-        return qs.filter(user_id=self.request.user.id)
+        recipe = get_object_or_404(Recipe, pk=kwargs['recipe_id'])
+        model = self.get_queryset().model
+        with transaction.atomic():
+            inserted = insert_or_ignore(
+                model, user_id=request.user.id, recipe_id=recipe.id
+            )
+            if not inserted:
+                self.fail('already_in')
+            self.list_changed(recipe.id, 1)
+        serializer = self.get_serializer(
+            model(user_id=request.user.id, recipe=recipe)
+        )
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def destroy(self, request, *args, **kwargs):
-        try:
-            return super().destroy(request, *args, **kwargs)
-        except Http404 as exc:
-            pk = kwargs['recipe_id']
-            if Recipe.objects.filter(pk=pk).exists():
-                message = self.error_messages['not_in']
-                raise exceptions.ValidationError(
-                    {
-                        api_settings.NON_FIELD_ERRORS_KEY: [
-                            message.format(self.get_list_name())
-                        ]
-                    }
-                )
-            raise exc
+        pk = kwargs['recipe_id']
+        model = self.get_queryset().model
+        with transaction.atomic():
+            deleted = delete_matching(
+                model, user_id=request.user.id, recipe_id=pk
+            )
+            if deleted:
+                self.list_changed(pk, -1)
+        if deleted:
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        if Recipe.objects.filter(pk=pk).exists():
+            self.fail('not_in')
+        raise Http404
+
+    def list_changed(self, recipe_id, delta):
+        """Account for a recipe added to (1) or removed from (-1) the list."""
+        if self.counter_field is not None:
+            update_counter(Recipe, recipe_id, self.counter_field, delta)
+            # The counter is shown and ordered by in the recipe lists.
+            transaction.on_commit(partial(bump_generation, RECIPES_GENERATION))
+        if self.user_recipe_ids is not None:
+            transaction.on_commit(
+                partial(self.user_recipe_ids.invalidate, self.request.user.id)
+            )
+
+    def fail(self, key):
+        message = self.error_messages[key].format(self.get_list_name())
+        raise exceptions.ValidationError(
+            {api_settings.NON_FIELD_ERRORS_KEY: [message]}
+        )
 
     def get_list_name(self):
         assert self.list_name is not None, (
@@ -1,10 +1,14 @@
+from functools import partial
+
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import DEFERRED
 
-from .fields import HEXColorField
+from .fields import HEXColorField, SearchVectorField
+from .images import delete_variants, enqueue_image_processing
 from .managers import RecipeManager
-from users.models import BaseModel
+from users.models import BaseModel, exclude_from_full_save
 
 User = get_user_model()
 
@@ -61,7 +65,7 @@ class Recipe(BaseModel):
         User,
         on_delete=models.CASCADE,
         related_name='recipes',
-        db_index=True,
+        db_index=False,
     )
     ingredients = models.ManyToManyField(
         Ingredient,
@@ -74,38 +78,110 @@ class Recipe(BaseModel):
     name = models.CharField(max_length=200)
     text = models.TextField()
     image = models.ImageField()
+    image_variants = models.JSONField(default=dict, editable=False)
     cooking_time = models.PositiveSmallIntegerField(
         validators=[MinValueValidator(1)],
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        db_index=True,
+        editable=False,
+    )
+    search_vector = SearchVectorField(null=True, editable=False)
 
     objects = RecipeManager()
 
+    counter_fields = ('favorites_count',)
+    db_maintained_fields = (*counter_fields, 'image_variants')
+
     class Meta:
-        ordering = ('-created_at',)
+        ordering = ('-created_at', '-id')
+        indexes = [
+            models.Index(
+                fields=('-created_at', '-id'),
+                name='recipe_created_at_id_idx',
+            ),
+            models.Index(
+                fields=('author', '-created_at', '-id'),
+                name='recipe_author_created_at_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
-    def _get_old_image(self):
-        if self.pk is None:
-            return None
-        try:
-            return self.__class__.objects.get(pk=self.pk).image
-        except self.__class__.DoesNotExist:
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_image_name = instance.__dict__.get('image', DEFERRED)
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        if fields is None or 'image' in fields:
+            self._loaded_image_name = self.image.name
+
+    def _get_old_image_name(self):
+        if self._state.adding:
             return None
+        name = getattr(self, '_loaded_image_name', DEFERRED)
+        if name is DEFERRED:
+            name = (
+                self.__class__.objects.filter(pk=self.pk)
+                .values_list('image', flat=True)
+                .first()
+            )
+        return name
 
     def save(self, *args, **kwargs):
-        old_image = self._get_old_image()
+        update_fields = kwargs.get('update_fields')
+        if 'image' in self.get_deferred_fields() or (
+            update_fields is not None and 'image' not in update_fields
+        ):
+            # The variants loaded with the instance may be older than the
+            # ones written by the image processing meanwhile.
+            exclude_from_full_save(self, kwargs, self.db_maintained_fields)
+            return super().save(*args, **kwargs)
+
+        old_image_name = self._get_old_image_name()
+        old_variants = {}
+        kept_fields = self.db_maintained_fields
+        if old_image_name != self.image.name or not self.image._committed:
+            old_variants, self.image_variants = self.image_variants, {}
+            kept_fields = self.counter_fields
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'image_variants'}
+        exclude_from_full_save(self, kwargs, kept_fields)
+
         save_result = super().save(*args, **kwargs)
-        if old_image is not None and old_image != self.image:
-            old_image.delete(save=False)
+        if old_image_name != self.image.name:
+            self._on_image_replaced(old_image_name, old_variants)
+        self._loaded_image_name = self.image.name
         return save_result
 
     def delete(self, *args, **kwargs):
+        image_name, variants = self.image.name, self.image_variants
         delete_result = super().delete(*args, **kwargs)
-        self.image.delete(save=False)
+        storage = self.image.storage
+        if image_name:
+            transaction.on_commit(partial(storage.delete, image_name))
+        transaction.on_commit(partial(delete_variants, storage, variants))
         return delete_result
 
+    def _on_image_replaced(self, old_image_name, old_variants):
+        """
+        Once committed, remove the files of the previous image and queue
+        generation of the variants of the new one.
+        """
+        storage = self.image.storage
+        if old_image_name:
+            transaction.on_commit(partial(storage.delete, old_image_name))
+        transaction.on_commit(partial(delete_variants, storage, old_variants))
+        if self.image:
+            transaction.on_commit(
+                partial(enqueue_image_processing, self.pk, self.image.name)
+            )
+
 
 class RecipeTag(models.Model):
     """Model for m2m: Recipe-Tags."""
@@ -119,6 +195,7 @@ class RecipeTag(models.Model):
     tag = models.ForeignKey(
         Tag,
         on_delete=models.CASCADE,
+        db_index=False,
     )
 
     class Meta:
@@ -130,6 +207,12 @@ class RecipeTag(models.Model):
                 name='unique_recipe_tag',
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=('tag', 'recipe'),
+                name='recipe_tag_tag_recipe_idx',
+            ),
+        ]
 
 
 class RecipeIngredient(models.Model):
@@ -191,6 +274,12 @@ class FavoriteRecipe(BaseRecipeToUser):
                 name='unique_favorite_recipe',
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=('created_at',),
+                name='favoriterecipe_created_at_idx',
+            ),
+        ]
 
 
 class ShoppingCart(BaseRecipeToUser):
@@ -203,3 +292,41 @@ class ShoppingCart(BaseRecipeToUser):
                 name='unique_shopping_cart_recipe',
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=('created_at',),
+                name='shoppingcart_created_at_idx',
+            ),
+        ]
+
+
+class RecipeRanking(models.Model):
+    """
+    Materialized trending score of a recipe, refreshed by the
+    `refresh_rankings` command.
+
+    The score is the logarithm of the sum of `exp(rate * t)` over the
+    favorite and shopping cart events of the recipe, so it never has to
+    be decayed: the decay factor at any moment is the same for every
+    recipe and does not change their order.
+    """
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='ranking',
+    )
+    trending_score = models.FloatField()
+    last_event_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=('-trending_score',),
+                name='recipe_trending_score_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.trending_score}'
@@ -0,0 +1,116 @@
+import math
+from datetime import datetime, timedelta, timezone
+
+from django.db import transaction
+from django.db.models import Max
+
+from .models import FavoriteRecipe, RecipeRanking, ShoppingCart
+
+TRENDING_HALF_LIFE = 3 * 24 * 60 * 60
+TRENDING_RATE = math.log(2) / TRENDING_HALF_LIFE
+TRENDING_EPOCH = datetime(2022, 1, 1, tzinfo=timezone.utc)
+RESCAN_WINDOW = timedelta(minutes=10)
+TRENDING_EVENTS = (
+    (FavoriteRecipe, 1.0),
+    (ShoppingCart, 0.5),
+)
+
+
+def log_add_exp(a, b):
+    """Return `log(exp(a) + exp(b))` without overflowing."""
+    if a < b:
+        a, b = b, a
+    return a + math.log1p(math.exp(b - a))
+
+
+def get_event_score(created_at, weight):
+    seconds = (created_at - TRENDING_EPOCH).total_seconds()
+    return TRENDING_RATE * seconds + math.log(weight)
+
+
+def collect_event_scores(recipe_ids=None):
+    """
+    Return `{recipe_id: (score, last_event_at)}` computed from all the
+    favorite and shopping cart events of the `recipe_ids`, or of every
+    recipe by default.
+    """
+    scores = {}
+    for model, weight in TRENDING_EVENTS:
+        events = model.objects.order_by()
+        if recipe_ids is not None:
+            events = events.filter(recipe_id__in=recipe_ids)
+        rows = events.values_list('recipe_id', 'created_at')
+        for recipe_id, created_at in rows.iterator(chunk_size=10000):
+            score = get_event_score(created_at, weight)
+            if recipe_id in scores:
+                old_score, last_event_at = scores[recipe_id]
+                score = log_add_exp(old_score, score)
+                created_at = max(created_at, last_event_at)
+            scores[recipe_id] = (score, created_at)
+    return scores
+
+
+def get_active_recipe_ids(since):
+    """Return the ids of the recipes with events created after `since`."""
+    recipe_ids = set()
+    for model, _ in TRENDING_EVENTS:
+        recipe_ids.update(
+            model.objects.filter(created_at__gt=since)
+            .order_by()
+            .values_list('recipe_id', flat=True)
+            .distinct()
+        )
+    return recipe_ids
+
+
+def refresh_rankings(full=False, batch_size=1000, rescan=RESCAN_WINDOW):
+    """
+    Recompute the trending scores of the recipes with new events and
+    return the number of rankings written.
+
+    `created_at` is set before the event commits, so an event may become
+    visible after a newer one has been processed. The recipes with events
+    created within `rescan` before the newest processed one are therefore
+    recomputed from all their events, which catches such late events as
+    long as their transactions are shorter than `rescan`. Recomputing
+    also drops the removed favorites and cart entries of these recipes;
+    the other ones keep them counted until a `full` refresh.
+    """
+    with transaction.atomic():
+        if full:
+            RecipeRanking.objects.all().delete()
+            since = None
+        else:
+            since = RecipeRanking.objects.aggregate(
+                since=Max('last_event_at')
+            )['since']
+        if since is None:
+            scores = collect_event_scores()
+            recipe_ids = list(scores)
+        else:
+            recipe_ids = sorted(get_active_recipe_ids(since - rescan))
+
+        for start in range(0, len(recipe_ids), batch_size):
+            end = start + batch_size
+            batch = recipe_ids[start:end]
+            if since is not None:
+                scores = collect_event_scores(batch)
+                RecipeRanking.objects.filter(recipe_id__in=batch).exclude(
+                    recipe_id__in=list(scores)
+                ).delete()
+            rankings = [
+                RecipeRanking(
+                    recipe_id=recipe_id,
+                    trending_score=scores[recipe_id][0],
+                    last_event_at=scores[recipe_id][1],
+                )
+                for recipe_id in batch
+                if recipe_id in scores
+            ]
+            RecipeRanking.objects.bulk_create(
+                rankings,
+                update_conflicts=True,
+                unique_fields=('recipe_id',),
+                update_fields=('trending_score', 'last_event_at'),
+            )
+    return len(recipe_ids)
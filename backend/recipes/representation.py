@@ -0,0 +1,222 @@
+"""
+Compiled read path for serializers.
+
+DRF renders every field of every object through the generic field
+machinery: `get_attribute()` walks the source with `isinstance` and
+callable checks, related fields wrap the pk into `PKOnlyObject`, and
+`CustomPKRelatedField` builds a new serializer (deep-copying its fields)
+for every single tag. `compile_representation()` turns the readable
+fields of a bound serializer into plain accessor functions once, so that
+rendering an object is a loop over precomputed callables.
+
+Only the fields whose behaviour is known are compiled; any other field,
+and any object the fast accessors cannot read, goes through DRF as
+before, so the output is the same.
+"""
+from operator import attrgetter
+
+from django.core.exceptions import FieldDoesNotExist, ObjectDoesNotExist
+from django.db import models
+from rest_framework import fields, relations, serializers
+from rest_framework.fields import SkipField
+
+from recipes.serializer_fields import CustomPKRelatedField
+
+FAST_READ_ERRORS = (AttributeError, KeyError, ObjectDoesNotExist, ValueError)
+
+CONVERTERS = {
+    fields.CharField.to_representation: str,
+    fields.IntegerField.to_representation: int,
+    fields.FloatField.to_representation: float,
+    fields.ReadOnlyField.to_representation: None,
+    relations.StringRelatedField.to_representation: str,
+}
+
+
+def compile_representation(serializer):
+    """
+    Return a function rendering an object the way `serializer` does.
+    `serializer` must be bound, so that method fields and nested
+    serializers see its context.
+    """
+    model = getattr(getattr(serializer, 'Meta', None), 'model', None)
+    readers = [
+        (field.field_name, compile_field(field, model))
+        for field in serializer._readable_fields
+    ]
+
+    def represent(instance):
+        ret = {}
+        for name, read in readers:
+            try:
+                ret[name] = read(instance)
+            except SkipField:
+                continue
+        return ret
+
+    return represent
+
+
+def compile_field(field, model):
+    if isinstance(field, serializers.SerializerMethodField):
+        return getattr(field.parent, field.method_name)
+
+    many = isinstance(
+        field, (serializers.ListSerializer, relations.ManyRelatedField)
+    )
+    if not is_model_path(model, field.source_attrs, many):
+        return drf_reader(field)
+
+    convert = compile_converter(field)
+    if convert is NotImplemented:
+        return drf_reader(field)
+
+    if is_pk_only(field):
+        getter = pk_getter(field.source)
+    else:
+        getter = attrgetter('.'.join(field.source_attrs))
+    if many:
+        return fast_reader(field, lambda obj: getter(obj).all(), convert)
+    return fast_reader(field, getter, convert)
+
+
+def compile_converter(field):
+    """
+    Return the function converting a non-null attribute value, `None` if
+    the value is rendered as is, or `NotImplemented` if the field cannot
+    be compiled.
+    """
+    if isinstance(field, serializers.ListSerializer):
+        represent = compile_nested(field.child)
+        if represent is NotImplemented or (
+            type(field).to_representation
+            is not serializers.ListSerializer.to_representation
+        ):
+            return NotImplemented
+        return lambda items: [represent(item) for item in items]
+
+    if isinstance(field, relations.ManyRelatedField):
+        if (
+            type(field).to_representation
+            is not relations.ManyRelatedField.to_representation
+        ):
+            return NotImplemented
+        convert = compile_converter(field.child_relation)
+        if convert is NotImplemented:
+            return NotImplemented
+        if convert is None:
+            return list
+        return lambda items: [convert(item) for item in items]
+
+    if isinstance(field, serializers.BaseSerializer):
+        return compile_nested(field)
+
+    if (
+        isinstance(field, CustomPKRelatedField)
+        and field.serializer_repr_class is not None
+        and type(field).to_representation
+        is CustomPKRelatedField.to_representation
+    ):
+        # The representation serializer is built without a context.
+        return compile_nested(field.serializer_repr_class())
+
+    if is_pk_only(field):
+        return None
+
+    return CONVERTERS.get(type(field).to_representation, NotImplemented)
+
+
+def compile_nested(serializer):
+    to_representation = type(serializer).to_representation
+    if to_representation not in (
+        serializers.Serializer.to_representation,
+        CompiledRepresentationMixin.to_representation,
+    ):
+        return NotImplemented
+    return compile_representation(serializer)
+
+
+def is_pk_only(field):
+    return (
+        type(field).to_representation
+        is relations.PrimaryKeyRelatedField.to_representation
+        and field.pk_field is None
+        and len(field.source_attrs) == 1
+    )
+
+
+def pk_getter(name):
+    def getter(obj):
+        return obj.serializable_value(name)
+
+    return getter
+
+
+def is_model_path(model, source_attrs, many):
+    """
+    Whether `source_attrs` are concrete model fields and relations only,
+    which plain attribute access reads the same way as DRF does.
+    """
+    if model is None or not source_attrs:
+        return False
+    for position, attr in enumerate(source_attrs, start=1):
+        try:
+            model_field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            return False
+        last = position == len(source_attrs)
+        to_many = bool(model_field.many_to_many or model_field.one_to_many)
+        if to_many != (last and many):
+            return False
+        if isinstance(model_field, models.ForeignObjectRel) and not to_many:
+            return False
+        model = model_field.related_model
+    return True
+
+
+def fast_reader(field, getter, convert):
+    read_with_drf = drf_reader(field)
+
+    def read(instance):
+        try:
+            value = getter(instance)
+        except FAST_READ_ERRORS:
+            return read_with_drf(instance)
+        if value is None or convert is None:
+            return value
+        return convert(value)
+
+    return read
+
+
+def drf_reader(field):
+    """Read a field the way `Serializer.to_representation()` does."""
+
+    def read(instance):
+        attribute = field.get_attribute(instance)
+        check_for_none = (
+            attribute.pk
+            if isinstance(attribute, relations.PKOnlyObject)
+            else attribute
+        )
+        if check_for_none is None:
+            return None
+        return field.to_representation(attribute)
+
+    return read
+
+
+class CompiledRepresentationMixin:
+    """
+    Serializer mixin rendering objects through `compile_representation()`.
+    The compiled function is built on first use and reused for every
+    object rendered by the same serializer, e.g. all the items of a list.
+    """
+
+    def to_representation(self, instance):
+        try:
+            represent = self._compiled_representation
+        except AttributeError:
+            represent = compile_representation(self)
+            self._compiled_representation = represent
+        return represent(instance)
@@ -0,0 +1,86 @@
+import json
+from collections import defaultdict
+
+from django.db import connections
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Upper
+
+from .indexes import recipe_search_index
+
+SEARCH_CONFIG = 'russian'
+
+
+def search_recipes(queryset, text):
+    """
+    Filter `queryset` by the search `text` and order it by relevance.
+
+    PostgreSQL matches the stored search vector, falling back to trigram
+    similarity of the name to tolerate typos. Other databases are served
+    by the in-process `recipe_search_index`.
+    """
+    if connections[queryset.db].vendor == 'postgresql':
+        return _search_postgresql(queryset, text)
+    return _search_index(queryset, text)
+
+
+def _search_postgresql(queryset, text):
+    # django.contrib.postgres requires psycopg2 at import time.
+    from django.contrib.postgres.lookups import TrigramSimilar
+    from django.contrib.postgres.search import (
+        SearchQuery,
+        SearchRank,
+        SearchVectorExact,
+        TrigramSimilarity,
+    )
+
+    query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+    name = Upper('name')
+    return (
+        queryset.filter(
+            SearchVectorExact(F('search_vector'), query)
+            | TrigramSimilar(name, text.upper())
+        )
+        .annotate(
+            search_rank=SearchRank(F('search_vector'), query),
+            search_similarity=TrigramSimilarity(name, text.upper()),
+        )
+        .order_by(
+            '-search_rank',
+            '-search_similarity',
+            *queryset.model._meta.ordering,
+        )
+    )
+
+
+def _search_index(queryset, text):
+    scores = recipe_search_index.score(text)
+    if not scores:
+        return queryset.none()
+    # Order by the score rather than by the position of every id, which
+    # takes a WHEN per matching recipe: scores are few distinct integers.
+    ids_by_score = defaultdict(list)
+    for pk, score in scores.items():
+        ids_by_score[score].append(pk)
+    connection = connections[queryset.db]
+    relevance = Case(
+        *(
+            When(pk__in=_id_list(ids, connection), then=Value(score))
+            for score, ids in ids_by_score.items()
+        ),
+        output_field=IntegerField(),
+    )
+    return queryset.filter(pk__in=_id_list(list(scores), connection)).order_by(
+        relevance.desc(), *queryset.model._meta.ordering
+    )
+
+
+def _id_list(ids, connection):
+    """
+    Return the right-hand side of an `__in` lookup on `ids`. SQLite gets
+    them as a single JSON parameter, which keeps the SQL small and stays
+    below its limit on the number of parameters.
+    """
+    if connection.vendor == 'sqlite':
+        return RawSQL('SELECT "value" FROM json_each(%s)', (json.dumps(ids),))
+    return ids
@@ -1,9 +1,100 @@
 from collections import OrderedDict
+from collections.abc import Mapping
 
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.storage import default_storage
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
 
 
-class CustomPKRelatedField(serializers.PrimaryKeyRelatedField):
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField which is able to resolve a batch of primary keys
+    with a single query.
+
+    Once `preload()` has been called with the raw input values,
+    `to_internal_value()` is served from the loaded objects and reports
+    the same errors as `PrimaryKeyRelatedField`.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._preloaded = None
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+    def preload(self, values):
+        pks = set()
+        for value in values:
+            try:
+                pks.add(self._to_pk(value))
+            except (
+                TypeError,
+                ValueError,
+                DjangoValidationError,
+                serializers.ValidationError,
+            ):
+                continue
+        self._preloaded = self.get_queryset().in_bulk(pks)
+
+    def to_internal_value(self, data):
+        if self._preloaded is None:
+            return super().to_internal_value(data)
+        if self.pk_field is not None:
+            data = self.pk_field.to_internal_value(data)
+        try:
+            pk = self._to_pk(data)
+        except (TypeError, ValueError, DjangoValidationError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return self._preloaded[pk]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+
+    def _to_pk(self, data):
+        if isinstance(data, bool):
+            raise TypeError
+        return self.get_queryset().model._meta.pk.to_python(data)
+
+
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    """ManyRelatedField which resolves all items with a single query."""
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str) and hasattr(data, '__iter__'):
+            self.child_relation.preload(data)
+        return super().to_internal_value(data)
+
+
+class BulkRelatedListSerializer(serializers.ListSerializer):
+    """
+    ListSerializer which resolves the `BulkPrimaryKeyRelatedField` fields
+    of its child with a single query per field.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            items = [item for item in data if isinstance(item, Mapping)]
+            for field in self.child.fields.values():
+                if (
+                    isinstance(field, BulkPrimaryKeyRelatedField)
+                    and not field.read_only
+                ):
+                    field.preload(
+                        item[field.field_name]
+                        for item in items
+                        if field.field_name in item
+                    )
+        return super().to_internal_value(data)
+
+
+class CustomPKRelatedField(BulkPrimaryKeyRelatedField):
     def __init__(self, **kwargs):
         self.serializer_repr_class = kwargs.pop('serializer_repr_class', None)
         if self.serializer_repr_class is not None:
@@ -37,3 +128,21 @@ class CustomPKRelatedField(serializers.PrimaryKeyRelatedField):
         if self.serializer_repr_class is not None:
             return self.serializer_repr_class(value).data
         return super().to_representation(value)
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """Represents generated image variants with their absolute URLs."""
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        representation = {}
+        for name, variant in value.items():
+            url = default_storage.url(variant['name'])
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            representation[name] = {
+                'url': url,
+                'width': variant['width'],
+                'height': variant['height'],
+            }
+        return representation
@@ -1,17 +1,19 @@
 from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
 from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db import transaction
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 from rest_framework.serializers import SerializerMethodField
 
-from recipes.models import (
-    FavoriteRecipe,
-    Ingredient,
-    Recipe,
-    ShoppingCart,
-    Tag,
+from recipes.models import Ingredient, Recipe, Tag
+from recipes.representation import CompiledRepresentationMixin
+from recipes.serializer_fields import (
+    BulkPrimaryKeyRelatedField,
+    BulkRelatedListSerializer,
+    CustomPKRelatedField,
+    ImageVariantsField,
 )
-from recipes.serializer_fields import CustomPKRelatedField
 from users.serializers.nested import UserSerializer
 
 User = get_user_model()
@@ -38,7 +40,7 @@ class IngredientSerializer(serializers.ModelSerializer):
 class RecipeIngredientSerializer(serializers.ModelSerializer):
     """Ingredient serializer for Recipe model."""
 
-    id = serializers.PrimaryKeyRelatedField(
+    id = BulkPrimaryKeyRelatedField(
         queryset=Ingredient.objects.all(),
         source='ingredient',
     )
@@ -53,13 +55,20 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
     class Meta:
         model = Recipe.ingredients.through
         fields = ('id', 'name', 'measurement_unit', 'amount')
+        list_serializer_class = BulkRelatedListSerializer
 
 
-class RecipeSerializer(serializers.ModelSerializer):
-    """Serializer for Recipe model."""
+class RecipeSerializer(
+    CompiledRepresentationMixin, serializers.ModelSerializer
+):
+    """
+    Serializer for Recipe model. Recipes are rendered through the compiled
+    read path of `CompiledRepresentationMixin`.
+    """
 
     author = UserSerializer(default=serializers.CurrentUserDefault())
     image = Base64ImageField()
+    image_variants = ImageVariantsField()
     ingredients = RecipeIngredientSerializer(
         many=True,
         allow_empty=False,
@@ -79,45 +88,42 @@ class RecipeSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Recipe
-        exclude = ('created_at', 'updated_at')
-
-    def __init__(self, *args, **kwargs):
-        fields = kwargs.pop('fields', None)
-        super().__init__(*args, **kwargs)
-
-        if fields is not None:
-            allowed = set(fields)
-            existing = set(self.fields)
-            for field_name in existing - allowed:
-                self.fields.pop(field_name)
+        exclude = (
+            'created_at',
+            'updated_at',
+            'favorites_count',
+            'search_vector',
+        )
 
     def get_is_favorited(self, obj):
-        return getattr(obj, 'in_favorite_recipe', False)
+        return obj.id in self.context.get('favorite_recipe_ids', ())
 
     def get_is_in_shopping_cart(self, obj):
-        return getattr(obj, 'in_shopping_cart', False)
+        return obj.id in self.context.get('cart_recipe_ids', ())
 
     def validate_ingredients(self, value):
-        checked_values = []
+        checked_ids = set()
         for element in value:
-            if (ingredient_obj := element['ingredient']) in checked_values:
+            if (ingredient_obj := element['ingredient']).pk in checked_ids:
                 error_detail = {
                     'id': [f'Ingredient "{ingredient_obj.name}" is repeated.'],
                 }
                 raise serializers.ValidationError([error_detail])
-            checked_values.append(ingredient_obj)
+            checked_ids.add(ingredient_obj.pk)
         return value
 
+    @transaction.atomic
     def create(self, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('recipe_ingredients')
 
         instance = self.Meta.model.objects.create(**validated_data)
-        self._set_tags(instance, tags)
-        self._set_ingredients(instance, ingredients)
+        self._set_tags(instance, tags, created=True)
+        self._set_ingredients(instance, ingredients, created=True)
 
         return instance
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         tags = validated_data.pop('tags', None)
         ingredients = validated_data.pop('recipe_ingredients', None)
@@ -133,67 +139,122 @@ class RecipeSerializer(serializers.ModelSerializer):
 
         return instance
 
-    def _set_tags(self, instance, tags):
-        instance.tags.set(tags)
+    def _set_tags(self, instance, tags, created=False):
+        """Write only the difference between the current and new tags."""
+        TagsThrough = self.Meta.model.tags.through
+        current = set() if created else {tag.pk for tag in instance.tags.all()}
+        new = {tag.pk for tag in tags}
+
+        if removed := current - new:
+            TagsThrough.objects.filter(
+                recipe=instance, tag_id__in=removed
+            ).delete()
+        TagsThrough.objects.bulk_create(
+            [TagsThrough(recipe=instance, tag_id=pk) for pk in new - current]
+        )
 
-    def _set_ingredients(self, instance, ingredients):
-        instance.ingredients.clear()
+    def _set_ingredients(self, instance, ingredients, created=False):
+        """
+        Write only the difference between the current and new ingredients:
+        at most one delete, one insert and one update of amounts.
+        """
         IngredientsThrough = self.Meta.model.ingredients.through
-        IngredientsThrough.objects.bulk_create(
-            [
-                IngredientsThrough(recipe=instance, **ingredient)
-                for ingredient in ingredients
-            ]
-        )
+        current = {}
+        if not created:
+            current = {
+                item.ingredient_id: item
+                for item in instance.recipe_ingredients.all()
+            }
+
+        to_create, to_update = [], []
+        for element in ingredients:
+            item = current.pop(element['ingredient'].pk, None)
+            if item is None:
+                to_create.append(
+                    IngredientsThrough(recipe=instance, **element)
+                )
+            elif item.amount != element['amount']:
+                item.amount = element['amount']
+                to_update.append(item)
+
+        if current:
+            IngredientsThrough.objects.filter(
+                pk__in=[item.pk for item in current.values()]
+            ).delete()
+        IngredientsThrough.objects.bulk_create(to_create)
+        IngredientsThrough.objects.bulk_update(to_update, ('amount',))
+
+
+class CookableRecipeSerializer(RecipeSerializer):
+    """Serializer for recipes ranked by coverage of the given ingredients."""
+
+    coverage = serializers.FloatField(read_only=True)
+
+
+class CookableQuerySerializer(serializers.Serializer):
+    """Validates the query of the cookable recipes endpoint."""
+
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=100,
+    )
 
 
-class RecipeToUserSerializerMixin(serializers.Serializer):
-    """Mixin serializer. Included `user` and `recipe` fields."""
+class RecipeShortSerializer(serializers.ModelSerializer):
+    """
+    Compact serializer for Recipe model. The image is represented by its
+    thumbnail once it has been generated.
+    """
 
-    user = serializers.HiddenField(default=serializers.CurrentUserDefault())
-    recipe = serializers.PrimaryKeyRelatedField(
-        queryset=Recipe.objects.all(),
-    )
+    image_variant = 'thumbnail'
+
+    image = serializers.SerializerMethodField()
+    image_width = serializers.SerializerMethodField()
+    image_height = serializers.SerializerMethodField()
 
     class Meta:
-        fields = ('user', 'recipe')
+        model = Recipe
+        fields = (
+            'id',
+            'name',
+            'image',
+            'image_width',
+            'image_height',
+            'cooking_time',
+        )
+
+    def get_image(self, obj):
+        variant = obj.image_variants.get(self.image_variant)
+        if variant is None:
+            url = obj.image.url
+        else:
+            url = default_storage.url(variant['name'])
+
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+    def get_image_width(self, obj):
+        return obj.image_variants.get(self.image_variant, {}).get('width')
+
+    def get_image_height(self, obj):
+        return obj.image_variants.get(self.image_variant, {}).get('height')
+
+
+class RecipeToUserSerializerMixin(serializers.Serializer):
+    """Mixin serializer. Represents a "recipe + user" row by its recipe."""
 
     def to_representation(self, instance):
-        fields = ('id', 'name', 'image', 'cooking_time')
-        return RecipeSerializer(instance.recipe, fields=fields).data
+        return RecipeShortSerializer(
+            instance.recipe, context=self.context
+        ).data
 
 
-class FavoriteRecipeSerializer(
-    RecipeToUserSerializerMixin, serializers.ModelSerializer
-):
+class FavoriteRecipeSerializer(RecipeToUserSerializerMixin):
     """Serializer for FavoriteRecipe model."""
 
-    class Meta:
-        model = FavoriteRecipe
-        fields = RecipeToUserSerializerMixin.Meta.fields
-        validators = [
-            serializers.UniqueTogetherValidator(
-                queryset=model.objects.all(),
-                fields=['user', 'recipe'],
-                message='The recipe has already been added to favorites.',
-            ),
-        ]
-
-
-class ShoppingCartSerializer(
-    RecipeToUserSerializerMixin, serializers.ModelSerializer
-):
-    """Serializer for ShoppingCart model."""
 
-    class Meta:
-        model = ShoppingCart
-        fields = RecipeToUserSerializerMixin.Meta.fields
-        validators = [
-            serializers.UniqueTogetherValidator(
-                queryset=model.objects.all(),
-                fields=['user', 'recipe'],
-                message=(
-                    'The recipe has already been added to the shopping cart.'
-                ),
-            ),
-        ]
+class ShoppingCartSerializer(RecipeToUserSerializerMixin):
+    """Serializer for ShoppingCart model."""
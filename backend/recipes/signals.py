@@ -0,0 +1,118 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .caches import (
+    RECIPE_GENERATION,
+    RECIPES_GENERATION,
+    bump_generation,
+    cart_recipe_ids,
+    favorite_recipe_ids,
+)
+from .indexes import (
+    ingredient_index,
+    recipe_ingredient_index,
+    recipe_search_index,
+)
+from .models import (
+    FavoriteRecipe,
+    Ingredient,
+    MeasurementUnit,
+    Recipe,
+    ShoppingCart,
+    Tag,
+)
+from users.services import update_counter
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=MeasurementUnit)
+@receiver(post_delete, sender=MeasurementUnit)
+def invalidate_ingredient_index(**kwargs):
+    transaction.on_commit(ingredient_index.invalidate)
+
+
+@receiver(post_delete, sender=Ingredient)
+def invalidate_recipe_ingredient_index(**kwargs):
+    # Deleting an ingredient cascades to recipes which are not saved.
+    transaction.on_commit(recipe_ingredient_index.invalidate)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tags(**kwargs):
+    transaction.on_commit(partial(bump_generation, 'tag'))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipe_search_index(**kwargs):
+    transaction.on_commit(recipe_search_index.invalidate)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def record_recipe_ingredients_change(instance, **kwargs):
+    transaction.on_commit(
+        partial(recipe_ingredient_index.record_change, instance.pk)
+    )
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipe_body(instance, **kwargs):
+    transaction.on_commit(
+        partial(bump_generation, RECIPE_GENERATION.format(instance.pk))
+    )
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=FavoriteRecipe)
+@receiver(post_delete, sender=FavoriteRecipe)
+def invalidate_recipe_lists(**kwargs):
+    transaction.on_commit(partial(bump_generation, RECIPES_GENERATION))
+
+
+@receiver(post_save, sender=Recipe)
+def count_created_recipe(instance, created, raw, **kwargs):
+    if created and not raw:
+        update_counter(User, instance.author_id, 'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def count_deleted_recipe(instance, **kwargs):
+    update_counter(User, instance.author_id, 'recipes_count', -1)
+
+
+@receiver(post_save, sender=FavoriteRecipe)
+def count_created_favorite(instance, created, raw, **kwargs):
+    if created and not raw:
+        update_counter(Recipe, instance.recipe_id, 'favorites_count', 1)
+
+
+@receiver(post_delete, sender=FavoriteRecipe)
+def count_deleted_favorite(instance, **kwargs):
+    update_counter(Recipe, instance.recipe_id, 'favorites_count', -1)
+
+
+@receiver(post_save, sender=FavoriteRecipe)
+@receiver(post_delete, sender=FavoriteRecipe)
+def invalidate_favorite_recipe_ids(instance, **kwargs):
+    transaction.on_commit(
+        partial(favorite_recipe_ids.invalidate, instance.user_id)
+    )
+
+
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def invalidate_cart_recipe_ids(instance, **kwargs):
+    transaction.on_commit(
+        partial(cart_recipe_ids.invalidate, instance.user_id)
+    )
@@ -0,0 +1,145 @@
+import base64
+import io
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.test import APIClient, APITestCase
+
+from recipes.images import get_image_pipeline
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+
+User = get_user_model()
+
+
+def image_bytes(color=(255, 0, 0), size=(64, 48)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def image_data_uri(color=(255, 0, 0), size=(64, 48)):
+    encoded = base64.b64encode(image_bytes(color, size)).decode()
+    return f'data:image/png;base64,{encoded}'
+
+
+class FoodgramTestCase(APITestCase):
+    """
+    Test case with the ingredients fixtures, three tags and a temporary
+    media directory. The cache is cleared before every test.
+    """
+
+    fixtures = ('measurement_units', 'ingredients')
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.settings_override = override_settings(
+            MEDIA_ROOT=cls.media_root,
+            RECIPE_IMAGE_PIPELINE={
+                'BACKEND': 'recipes.images.SyncImagePipeline',
+                'OPTIONS': {},
+            },
+        )
+        cls.settings_override.enable()
+        get_image_pipeline.cache_clear()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.settings_override.disable()
+        get_image_pipeline.cache_clear()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tags = [
+            Tag.objects.create(
+                name='Завтрак', color='#E26C2D', slug='breakfast'
+            ),
+            Tag.objects.create(name='Обед', color='#49B64E', slug='lunch'),
+            Tag.objects.create(name='Ужин', color='#8775D2', slug='dinner'),
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    @contextmanager
+    def assert_num_statements(self, number):
+        """
+        Like `assertNumQueries()`, without the savepoints: the test runs in
+        a transaction, so the atomic blocks of the code under test show up
+        as savepoints instead of the uncounted BEGIN and COMMIT.
+        """
+        with CaptureQueriesContext(connection) as context:
+            yield
+        statements = [
+            query['sql']
+            for query in context.captured_queries
+            if not query['sql'].startswith(
+                ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+            )
+        ]
+        self.assertEqual(len(statements), number, '\n'.join(statements))
+
+    @staticmethod
+    def create_user(username):
+        return User.objects.create_user(
+            email=f'{username}@example.com',
+            username=username,
+            first_name=username,
+            last_name='Test',
+            password='secret-password',
+        )
+
+    @staticmethod
+    def client_for(user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def recipe_payload(self, ingredients_count=3, tags=None, name='Рецепт'):
+        if tags is None:
+            tags = self.tags[:2]
+        ingredient_ids = Ingredient.objects.order_by('pk').values_list(
+            'pk', flat=True
+        )[:ingredients_count]
+        return {
+            'ingredients': [
+                {'id': pk, 'amount': 10 + number}
+                for number, pk in enumerate(ingredient_ids)
+            ],
+            'tags': [tag.pk for tag in tags],
+            'image': image_data_uri(),
+            'name': name,
+            'text': 'Текст рецепта',
+            'cooking_time': 5,
+        }
+
+    @staticmethod
+    def create_recipe(author, ingredients=(), tags=(), name='Рецепт'):
+        """Create a recipe through the ORM, `ingredients` with amount 1."""
+        recipe = Recipe.objects.create(
+            author=author,
+            name=name,
+            text='Текст рецепта',
+            image='recipe.png',
+            cooking_time=5,
+        )
+        RecipeIngredient.objects.bulk_create(
+            [
+                RecipeIngredient(
+                    recipe=recipe, ingredient=ingredient, amount=1
+                )
+                for ingredient in ingredients
+            ]
+        )
+        recipe.tags.set(tags)
+        return recipe
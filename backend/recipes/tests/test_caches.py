@@ -0,0 +1,207 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from recipes.caches import (
+    GENERATION_KEY,
+    OBJECT_GENERATION_TIMEOUT,
+    RecipeBodies,
+    UserRecipeIds,
+    bump_generation,
+    cart_recipe_ids,
+    favorite_recipe_ids,
+    get_generation,
+    get_generation_timeout,
+)
+from recipes.models import (
+    FavoriteRecipe,
+    Ingredient,
+    MeasurementUnit,
+    ShoppingCart,
+)
+from recipes.tests.base import FoodgramTestCase
+from users.authentication import CachedTokenAuthentication
+from users.caches import FOLLOWED_IDS_TIMEOUT
+
+
+class GenerationTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_object_generations_expire(self):
+        for name in ('auth-token:abc', 'follow:1', 'recipe:1', 'user:1'):
+            with self.subTest(name=name):
+                self.assertEqual(
+                    get_generation_timeout(name), OBJECT_GENERATION_TIMEOUT
+                )
+        self.assertGreaterEqual(
+            OBJECT_GENERATION_TIMEOUT,
+            max(
+                CachedTokenAuthentication.cache_timeout,
+                FOLLOWED_IDS_TIMEOUT,
+                RecipeBodies.timeout,
+                UserRecipeIds.timeout,
+            ),
+        )
+
+    def test_global_generations_are_kept(self):
+        for name in ('tag', 'ingredient', 'recipe', 'user'):
+            with self.subTest(name=name):
+                self.assertIsNone(get_generation_timeout(name))
+
+    def test_expired_generation_starts_over(self):
+        generation = get_generation('recipe:1')
+        self.assertEqual(bump_generation('recipe:1'), generation + 1)
+        cache.delete(GENERATION_KEY.format('recipe:1'))
+        self.assertNotIn(
+            get_generation('recipe:1'), (generation, generation + 1)
+        )
+        cache.delete(GENERATION_KEY.format('recipe:1'))
+        self.assertNotIn(
+            bump_generation('recipe:1'), (generation, generation + 1)
+        )
+
+
+class CachedResponseTests(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_recipe(
+            self.create_user('author'),
+            Ingredient.objects.order_by('pk')[:1],
+            self.tags[:1],
+        )
+
+    def test_etag(self):
+        response = self.client.get('/api/tags/')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        for if_none_match in (etag, f'W/{etag}', f'"other", {etag}', '*'):
+            with self.subTest(if_none_match=if_none_match):
+                with self.assertNumQueries(0):
+                    response = self.client.get(
+                        '/api/tags/', HTTP_IF_NONE_MATCH=if_none_match
+                    )
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+                self.assertEqual(response['ETag'], etag)
+        response = self.client.get('/api/tags/', HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_tag_change_invalidates_the_lists(self):
+        etag = self.client.get('/api/tags/')['ETag']
+        recipes = self.client.get('/api/recipes/', {'limit': 10}).json()
+        self.assertEqual(
+            recipes['results'][0]['tags'][0]['name'], self.tags[0].name
+        )
+        with self.assertNumQueries(0):
+            self.client.get('/api/tags/')
+        self.tags[0].name = 'Бранч'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tags[0].save()
+        response = self.client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('Бранч', [tag['name'] for tag in response.json()])
+        recipes = self.client.get('/api/recipes/', {'limit': 10}).json()
+        self.assertEqual(recipes['results'][0]['tags'][0]['name'], 'Бранч')
+
+    def test_ingredient_change_invalidates_the_list(self):
+        params = {'name': 'тестовый'}
+        self.assertEqual(
+            self.client.get('/api/ingredients/', params).json(), []
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            Ingredient.objects.create(
+                name='тестовый продукт',
+                measurement_unit=MeasurementUnit.objects.create(name='ломоть'),
+            )
+        self.assertEqual(
+            self.client.get('/api/ingredients/', params).json(),
+            [
+                {
+                    'id': Ingredient.objects.get(name='тестовый продукт').pk,
+                    'name': 'тестовый продукт',
+                    'measurement_unit': 'ломоть',
+                }
+            ],
+        )
+
+
+class UserRecipeIdsTests(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        author = self.create_user('author')
+        self.reader = self.create_user('reader')
+        self.other = self.create_user('other')
+        self.recipes = [
+            self.create_recipe(author, name=name)
+            for name in ('first', 'second', 'third')
+        ]
+        first, second, third = self.recipes
+        FavoriteRecipe.objects.create(user=self.reader, recipe=first)
+        FavoriteRecipe.objects.create(user=self.other, recipe=third)
+        ShoppingCart.objects.create(user=self.reader, recipe=second)
+
+    def test_sets_are_per_user_and_list(self):
+        first, second, third = (recipe.pk for recipe in self.recipes)
+        with self.assertNumQueries(3):
+            self.assertEqual(favorite_recipe_ids.get(self.reader), {first})
+            self.assertEqual(cart_recipe_ids.get(self.reader), {second})
+            self.assertEqual(favorite_recipe_ids.get(self.other), {third})
+        with self.assertNumQueries(0):
+            self.assertEqual(favorite_recipe_ids.get(self.reader), {first})
+            self.assertEqual(cart_recipe_ids.get(self.reader), {second})
+            self.assertEqual(
+                favorite_recipe_ids.get(AnonymousUser()), frozenset()
+            )
+
+    def test_writes_invalidate_only_their_user_and_list(self):
+        first, second, third = self.recipes
+        favorite_recipe_ids.get(self.other)
+        cart_recipe_ids.get(self.reader)
+        with self.captureOnCommitCallbacks(execute=True):
+            FavoriteRecipe.objects.create(user=self.reader, recipe=third)
+        with self.assertNumQueries(0):
+            favorite_recipe_ids.get(self.other)
+            cart_recipe_ids.get(self.reader)
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                favorite_recipe_ids.get(self.reader), {first.pk, third.pk}
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            ShoppingCart.objects.filter(user=self.reader).delete()
+        self.assertEqual(cart_recipe_ids.get(self.reader), frozenset())
+
+    def get_flags(self, client, **params):
+        response = client.get('/api/recipes/', {'limit': 10, **params})
+        self.assertEqual(response.status_code, 200)
+        return {
+            recipe['name']: (
+                recipe['is_favorited'],
+                recipe['is_in_shopping_cart'],
+            )
+            for recipe in response.json()['results']
+        }
+
+    def test_flags_and_filters(self):
+        client = self.client_for(self.reader)
+        self.assertEqual(
+            self.get_flags(client),
+            {
+                'first': (True, False),
+                'second': (False, True),
+                'third': (False, False),
+            },
+        )
+        self.assertEqual(
+            self.get_flags(client, is_favorited=1), {'first': (True, False)}
+        )
+        self.assertEqual(
+            self.get_flags(client, is_in_shopping_cart=1),
+            {'second': (False, True)},
+        )
+        self.assertEqual(
+            set(self.get_flags(self.client, is_favorited=1).values()),
+            {(False, False)},
+        )
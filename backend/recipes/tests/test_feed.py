@@ -0,0 +1,195 @@
+import os
+import time
+import unittest
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from recipes.feeds import FeedPagination, filter_feed
+from recipes.models import Recipe
+from recipes.tests.base import FoodgramTestCase
+from users.models import Follow
+from users.paginations import KeysetPagination
+
+User = get_user_model()
+
+
+class FeedTests(FoodgramTestCase):
+    url = '/api/recipes/feed/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.reader = cls.create_user('reader')
+        cls.authors = [
+            cls.create_user(f'author{number}') for number in range(3)
+        ]
+        for number in range(12):
+            cls.create_recipe(cls.authors[number % 3], name=str(number))
+        # Recipes created at the same moment: the id breaks the ties.
+        now = timezone.now()
+        for recipe in Recipe.objects.all():
+            Recipe.objects.filter(pk=recipe.pk).update(
+                created_at=now - timedelta(minutes=recipe.pk % 4)
+            )
+        for author in cls.authors[:2]:
+            Follow.objects.create(follower=cls.reader, follow_to=author)
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.client_for(self.reader)
+
+    def expected_ids(self):
+        return list(
+            Recipe.objects.filter(
+                author_id__in=Follow.objects.filter(
+                    follower=self.reader
+                ).values('follow_to_id')
+            )
+            .order_by('-created_at', '-id')
+            .values_list('id', flat=True)
+        )
+
+    def walk(self, limit):
+        ids, url, params = [], self.url, {'limit': limit}
+        while url is not None:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            self.assertLessEqual(len(data['results']), limit)
+            ids.extend(recipe['id'] for recipe in data['results'])
+            url, params = data['next'], None
+        return ids
+
+    def test_requires_authentication(self):
+        self.assertEqual(self.client_for(None).get(self.url).status_code, 401)
+
+    def test_walk(self):
+        expected = self.expected_ids()
+        self.assertEqual(len(expected), 8)
+        for limit in (1, 3, 8, 20):
+            with self.subTest(limit=limit):
+                self.assertEqual(self.walk(limit), expected)
+
+    def test_walk_past_the_timeline(self):
+        # Pages past the cached head of the feed come from the database.
+        expected = self.expected_ids()
+        for size in (1, 3, 5):
+            with self.subTest(size=size), mock.patch.object(
+                FeedPagination.timeline, 'size', size
+            ):
+                cache.clear()
+                self.assertEqual(self.walk(2), expected)
+
+    def test_follows_take_effect_at_once(self):
+        self.walk(20)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                f'/api/users/{self.authors[2].pk}/subscribe/'
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(self.walk(20)), 12)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(
+                f'/api/users/{self.authors[0].pk}/subscribe/'
+            )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.walk(20), self.expected_ids())
+        self.assertEqual(len(self.expected_ids()), 8)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'cursor': 'not a cursor'})
+        self.assertEqual(response.status_code, 404)
+
+
+@unittest.skipUnless(
+    os.environ.get('FOODGRAM_BENCHMARKS'),
+    'set FOODGRAM_BENCHMARKS=1 to run the benchmarks',
+)
+class FeedBenchmark(FoodgramTestCase):
+    authors_count = 1000
+    followed_count = 250
+    recipes_per_author = 20
+    pages = 20
+    page_size = 6
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.reader = cls.create_user('reader')
+        authors = User.objects.bulk_create(
+            [
+                User(
+                    email=f'author{number}@example.com',
+                    username=f'author{number}',
+                )
+                for number in range(cls.authors_count)
+            ]
+        )
+        if authors[0].pk is None:
+            authors = list(User.objects.filter(username__startswith='author'))
+        now = timezone.now()
+        Recipe.objects.bulk_create(
+            [
+                Recipe(
+                    author=author,
+                    name=f'{number}',
+                    text='Текст рецепта',
+                    image='recipe.png',
+                    cooking_time=5,
+                    created_at=now - timedelta(seconds=number),
+                )
+                for number, author in enumerate(
+                    authors * cls.recipes_per_author
+                )
+            ],
+            batch_size=1000,
+        )
+        Follow.objects.bulk_create(
+            [
+                Follow(follower=cls.reader, follow_to=author)
+                for author in authors[
+                    :: cls.authors_count // cls.followed_count
+                ]
+            ]
+        )
+
+    def walk(self, pagination_class, queryset):
+        ids, params = [], {'limit': self.page_size}
+        for _ in range(self.pages):
+            request = Request(APIRequestFactory().get('/', params))
+            request.user = self.reader
+            pagination = pagination_class()
+            ids.extend(
+                recipe.pk
+                for recipe in pagination.paginate_queryset(queryset, request)
+            )
+            params['cursor'] = pagination.encode_cursor(
+                pagination.next_position
+            )
+        return ids
+
+    def measure(self, pagination_class, queryset):
+        started = time.perf_counter()
+        ids = self.walk(pagination_class, queryset)
+        elapsed = time.perf_counter() - started
+        return ids, self.pages / elapsed
+
+    def test_timeline_is_faster(self):
+        # Warm up the timeline, as the first page of a session does.
+        self.walk(FeedPagination, Recipe.objects.all())
+        keyset_ids, keyset = self.measure(
+            KeysetPagination, filter_feed(Recipe.objects.all(), self.reader)
+        )
+        feed_ids, feed = self.measure(FeedPagination, Recipe.objects.all())
+        self.assertEqual(feed_ids, keyset_ids)
+        print(
+            f'\npages/s: keyset query {keyset:.0f}, timeline {feed:.0f} '
+            f'(x{feed / keyset:.1f})'
+        )
+        self.assertGreater(feed, keyset)
@@ -0,0 +1,138 @@
+import os
+import time
+import unittest
+
+from recipes.filters import RecipeFilter
+from recipes.models import Recipe, RecipeTag
+from recipes.tests.base import FoodgramTestCase
+
+
+class RecipeTagsFilterTests(FoodgramTestCase):
+    url = '/api/recipes/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        author = cls.create_user('author')
+        breakfast, lunch, dinner = cls.tags
+        cls.tag_sets = {
+            'both': (breakfast, lunch),
+            'all': (breakfast, lunch, dinner),
+            'breakfast': (breakfast,),
+            'lunch': (lunch,),
+            'dinner': (dinner,),
+            'none': (),
+        }
+        cls.recipe_ids = {
+            name: cls.create_recipe(author, tags=tags, name=name).pk
+            for name, tags in cls.tag_sets.items()
+        }
+
+    def expected_names(self, *slugs):
+        return {
+            name
+            for name, tags in self.tag_sets.items()
+            if {tag.slug for tag in tags} & set(slugs)
+        }
+
+    def test_page_mode_has_no_duplicates_and_exact_count(self):
+        for slugs in (['breakfast'], ['breakfast', 'lunch'], ['dinner']):
+            with self.subTest(slugs=slugs):
+                data = self.client.get(
+                    self.url, {'tags': slugs, 'limit': 100}
+                ).json()
+                names = [recipe['name'] for recipe in data['results']]
+                self.assertEqual(len(names), len(set(names)))
+                self.assertEqual(set(names), self.expected_names(*slugs))
+                self.assertEqual(data['count'], len(names))
+
+    def test_count_matches_pages(self):
+        slugs = ['breakfast', 'lunch', 'dinner']
+        names = []
+        for page in (1, 2, 3):
+            data = self.client.get(
+                self.url, {'tags': slugs, 'limit': 2, 'page': page}
+            ).json()
+            names += [recipe['name'] for recipe in data['results']]
+        self.assertEqual(data['count'], 5)
+        self.assertEqual(sorted(names), sorted(self.expected_names(*slugs)))
+
+    def test_cursor_mode_has_no_duplicates(self):
+        slugs = ['breakfast', 'lunch']
+        names = []
+        url, params = self.url, {'tags': slugs, 'limit': 1, 'cursor': ''}
+        while url:
+            data = self.client.get(url, params).json()
+            names += [recipe['name'] for recipe in data['results']]
+            url, params = data['next'], None
+        self.assertEqual(len(names), len(set(names)))
+        self.assertEqual(set(names), self.expected_names(*slugs))
+
+    def test_unknown_slug_is_rejected(self):
+        response = self.client.get(self.url, {'tags': 'unknown'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('tags', response.json())
+
+
+@unittest.skipUnless(
+    os.environ.get('FOODGRAM_BENCHMARKS'),
+    'set FOODGRAM_BENCHMARKS=1 to run the benchmarks',
+)
+class TagsFilterBenchmark(FoodgramTestCase):
+    recipes_count = 10_000
+    rounds = 20
+    slugs = ['breakfast', 'lunch']
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        author = cls.create_user('author')
+        recipes = Recipe.objects.bulk_create(
+            [
+                Recipe(
+                    author=author,
+                    name=str(number),
+                    text='Текст рецепта',
+                    image='recipe.png',
+                    cooking_time=5,
+                )
+                for number in range(cls.recipes_count)
+            ],
+            batch_size=1000,
+        )
+        if recipes[0].pk is None:
+            recipes = Recipe.objects.all()
+        # Every recipe gets one to three tags, so joins repeat recipes.
+        RecipeTag.objects.bulk_create(
+            [
+                RecipeTag(recipe=recipe, tag=tag)
+                for number, recipe in enumerate(recipes)
+                for tag in cls.tags[: number % 3 + 1]
+            ],
+            batch_size=1000,
+        )
+
+    def measure(self, filter_tags):
+        started = time.perf_counter()
+        for _ in range(self.rounds):
+            queryset = filter_tags(Recipe.objects.all())
+            page = list(queryset[:6])
+            count = queryset.count()
+        elapsed = time.perf_counter() - started
+        return [recipe.pk for recipe in page], count, self.rounds / elapsed
+
+    def filter_by_join(self, queryset):
+        return queryset.filter(tags__slug__in=self.slugs).distinct()
+
+    def filter_by_exists(self, queryset):
+        return RecipeFilter({'tags': self.slugs}, queryset).qs
+
+    def test_exists_is_faster(self):
+        *joined, join = self.measure(self.filter_by_join)
+        *existing, exists = self.measure(self.filter_by_exists)
+        self.assertEqual(existing, joined)
+        print(
+            f'\npages/s: JOIN DISTINCT {join:.0f}, EXISTS {exists:.0f} '
+            f'(x{exists / join:.1f})'
+        )
+        self.assertGreater(exists, join)
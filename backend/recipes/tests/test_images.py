@@ -0,0 +1,73 @@
+from django.core.files.base import ContentFile
+
+from recipes.images import (
+    IMAGE_VARIANTS,
+    delete_variants,
+    generate_variants,
+    process_recipe_image,
+)
+from recipes.models import Recipe
+from recipes.tests.base import FoodgramTestCase, image_bytes
+
+
+class ImageVariantsTests(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = self.create_user('author')
+        self.storage = Recipe._meta.get_field('image').storage
+
+    def create_recipe_with_image(self, image_name, size):
+        image_name = self.storage.save(
+            image_name, ContentFile(image_bytes(size=size))
+        )
+        recipe = self.create_recipe(self.author, name=image_name)
+        Recipe.objects.filter(pk=recipe.pk).update(image=image_name)
+        return recipe, image_name
+
+    def test_same_stems_get_own_variants(self):
+        images = [
+            self.create_recipe_with_image(name, size)
+            for name, size in (
+                ('one/photo.png', (60, 40)),
+                ('two/photo.png', (40, 60)),
+                ('one/photo.jpg', (50, 50)),
+            )
+        ]
+        variants = [
+            process_recipe_image(recipe.pk, image_name)
+            for recipe, image_name in images
+        ]
+        for variant_name in IMAGE_VARIANTS:
+            names = {variant[variant_name]['name'] for variant in variants}
+            self.assertEqual(len(names), len(images))
+        self.assertEqual(
+            [
+                (variant['thumbnail']['width'], variant['thumbnail']['height'])
+                for variant in variants
+            ],
+            [(60, 40), (40, 60), (50, 50)],
+        )
+
+        delete_variants(self.storage, variants[0])
+        for variant in variants[1:]:
+            for variant_name, data in variant.items():
+                self.assertTrue(self.storage.exists(data['name']))
+        recipe, _ = images[1]
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image_variants, variants[1])
+
+    def test_variants_of_same_file_are_reused(self):
+        _, image_name = self.create_recipe_with_image('dish.png', (64, 48))
+        variants = generate_variants(self.storage, image_name)
+        self.assertEqual(generate_variants(self.storage, image_name), variants)
+
+    def test_new_content_under_same_name_is_rendered_again(self):
+        _, image_name = self.create_recipe_with_image('dish.png', (64, 48))
+        variants = generate_variants(self.storage, image_name)
+        self.storage.delete(image_name)
+        self.storage.save(image_name, ContentFile(image_bytes(size=(30, 20))))
+        new_variants = generate_variants(self.storage, image_name)
+        self.assertNotEqual(
+            new_variants['thumbnail']['name'], variants['thumbnail']['name']
+        )
+        self.assertEqual(new_variants['thumbnail']['width'], 30)
@@ -0,0 +1,130 @@
+import io
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.core.management import CommandError, call_command
+from django.test import override_settings
+
+from recipes.management.commands.import_ingredients import iter_json_array
+from recipes.models import Ingredient, MeasurementUnit
+from recipes.tests.base import FoodgramTestCase
+
+
+class IterJsonArrayTests(FoodgramTestCase):
+    def test_items_split_across_chunks(self):
+        items = [{'name': f'item {number}'} for number in range(50)]
+        items += [12345, 'text', [1, 2], None]
+        text = json.dumps(items, indent=2)
+        for chunk_size in (1, 3, 7, 64, len(text)):
+            with self.subTest(chunk_size=chunk_size):
+                parsed = iter_json_array(io.StringIO(text), chunk_size)
+                self.assertEqual(list(parsed), items)
+
+    def test_invalid_input(self):
+        for text in ('{"name": "x"}', '[{"name": "x"}', '[1, }]'):
+            with self.subTest(text=text):
+                with self.assertRaises(CommandError):
+                    list(iter_json_array(io.StringIO(text), 4))
+
+
+class ImportIngredientsTests(FoodgramTestCase):
+    rows_count = 100_000
+
+    def setUp(self):
+        super().setUp()
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def import_file(self, name, content, *args):
+        path = self.directory / name
+        path.write_text(content, encoding='utf-8')
+        stdout = io.StringIO()
+        call_command('import_ingredients', str(path), *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_large_json_import(self):
+        unit = MeasurementUnit.objects.order_by('pk').first()
+        ingredients_before = Ingredient.objects.count()
+        rows = []
+        created = skipped = 0
+        for number in range(1, self.rows_count + 1):
+            if number % 10 == 0:
+                # Repeats the previous row, with extra whitespace.
+                name = f' ingredient {number - 1} '
+                rows.append({'name': name, 'measurement_unit': 'g'})
+            elif number % 25 == 0:
+                rows.append({'name': '', 'measurement_unit': 'g'})
+                skipped += 1
+            elif number % 2:
+                name = f'ingredient {number}'
+                rows.append({'name': name, 'measurement_unit': 'g'})
+                created += 1
+            else:
+                fields = {
+                    'name': f'ingredient {number}',
+                    'measurement_unit': unit.pk,
+                }
+                rows.append({'model': 'recipes.ingredient', 'fields': fields})
+                created += 1
+        content = json.dumps(rows, ensure_ascii=False)
+
+        output = self.import_file('ingredients.json', content)
+        self.assertIn(
+            f'Imported {self.rows_count} rows ({created} new ingredients, '
+            f'{skipped} invalid rows skipped)',
+            output,
+        )
+        self.assertEqual(
+            Ingredient.objects.count(), ingredients_before + created
+        )
+        self.assertTrue(
+            Ingredient.objects.filter(
+                name='ingredient 2', measurement_unit=unit
+            ).exists()
+        )
+        self.assertTrue(
+            Ingredient.objects.filter(
+                name='ingredient 9', measurement_unit__name='g'
+            ).exists()
+        )
+
+        output = self.import_file('ingredients.json', content)
+        self.assertIn('(0 new ingredients', output)
+        self.assertEqual(
+            Ingredient.objects.count(), ingredients_before + created
+        )
+
+    def test_csv_import(self):
+        output = self.import_file(
+            'ingredients.txt',
+            'name,measurement_unit\n'
+            'тестовая соль,г\n'
+            '"перец, чёрный",щепотка\n'
+            'broken row\n',
+            '--format=csv',
+        )
+        self.assertIn('(2 new ingredients, 1 invalid rows skipped)', output)
+        self.assertTrue(
+            Ingredient.objects.filter(
+                name='перец, чёрный', measurement_unit__name='щепотка'
+            ).exists()
+        )
+
+    def test_warns_about_local_cache(self):
+        content = '[{"name": "тестовая соль", "measurement_unit": "г"}]'
+        self.assertIn(
+            'local to each process', self.import_file('a.json', content)
+        )
+        shared = {
+            'default': {
+                'BACKEND': (
+                    'django.core.cache.backends.filebased.FileBasedCache'
+                ),
+                'LOCATION': str(self.directory / 'cache'),
+            },
+        }
+        with override_settings(CACHES=shared):
+            output = self.import_file('a.json', content)
+        self.assertNotIn('local to each process', output)
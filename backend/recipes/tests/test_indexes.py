@@ -0,0 +1,302 @@
+import os
+import time
+import unittest
+from unittest import mock
+
+from recipes.filters import RecipeFilter
+from recipes.indexes import (
+    IngredientIndex,
+    RecipeIngredientIndex,
+    recipe_ingredient_index,
+)
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+from recipes.tests.base import FoodgramTestCase
+
+
+class IngredientIndexTests(FoodgramTestCase):
+    prefixes = ('', 'с', 'Сол', 'молоко', 'несуществующее')
+
+    def test_search_matches_the_catalog(self):
+        index = IngredientIndex()
+        ingredients = Ingredient.objects.select_related('measurement_unit')
+        for prefix in self.prefixes:
+            with self.subTest(prefix=prefix):
+                expected = {
+                    (ingredient.pk, ingredient.measurement_unit.name)
+                    for ingredient in ingredients
+                    if ingredient.name.casefold().startswith(prefix.casefold())
+                }
+                found = index.search(prefix)
+                self.assertEqual(
+                    {(item['id'], item['measurement_unit']) for item in found},
+                    expected,
+                )
+                self.assertEqual(len(found), len(expected))
+
+    def test_endpoints(self):
+        response = self.client.get('/api/ingredients/', {'name': 'Соль'})
+        self.assertEqual(response.status_code, 200)
+        names = [item['name'] for item in response.json()]
+        self.assertIn('соль морская', names)
+        self.assertTrue(all(name.startswith('соль') for name in names))
+        self.assertEqual(names, sorted(names, key=str.casefold))
+        ingredient = Ingredient.objects.get(name='соль морская')
+        response = self.client.get(f'/api/ingredients/{ingredient.pk}/')
+        self.assertEqual(response.json()['name'], 'соль морская')
+        for pk in ('abc', 0):
+            with self.subTest(pk=pk):
+                response = self.client.get(f'/api/ingredients/{pk}/')
+                self.assertEqual(response.status_code, 404)
+
+
+@unittest.skipUnless(
+    os.environ.get('FOODGRAM_BENCHMARKS'),
+    'set FOODGRAM_BENCHMARKS=1 to run the benchmarks',
+)
+class IngredientIndexBenchmark(FoodgramTestCase):
+    rounds = 50
+    prefixes = ('с', 'мо', 'кар', 'яблоко')
+
+    def measure(self, search):
+        started = time.perf_counter()
+        for _ in range(self.rounds):
+            for prefix in self.prefixes:
+                search(prefix)
+        elapsed = time.perf_counter() - started
+        return self.rounds * len(self.prefixes) / elapsed
+
+    @staticmethod
+    def search_database(prefix):
+        return list(
+            Ingredient.objects.filter(name__istartswith=prefix)
+            .order_by('name')
+            .values('id', 'name', 'measurement_unit__name')
+        )
+
+    def test_index_is_faster(self):
+        index = IngredientIndex()
+        index.search()
+        database = self.measure(self.search_database)
+        indexed = self.measure(index.search)
+        print(
+            f'\nsearches/s: database {database:.0f}, index {indexed:.0f} '
+            f'(x{indexed / database:.1f})'
+        )
+        self.assertGreater(indexed, database)
+
+
+class RecipeIngredientIndexTests(FoodgramTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.author = cls.create_user('author')
+        cls.ingredients = list(Ingredient.objects.order_by('pk')[:4])
+        first, second, third, _ = cls.ingredients
+        cls.recipes = [
+            cls.create_recipe(cls.author, (first, second)),
+            cls.create_recipe(cls.author, (second, third)),
+        ]
+
+    def setUp(self):
+        super().setUp()
+        self.index = RecipeIngredientIndex()
+
+    def ids(self, *numbers):
+        return [self.ingredients[number].pk for number in numbers]
+
+    def assert_same_as_rebuilt(self):
+        snapshot = self.index._get_snapshot()
+        rebuilt = self.index._build(snapshot.generation)
+        self.assertEqual(
+            {pk: sorted(ids) for pk, ids in snapshot.postings.items()},
+            {pk: sorted(ids) for pk, ids in rebuilt.postings.items()},
+        )
+        self.assertEqual(
+            {pk: sorted(ids) for pk, ids in snapshot.ingredients.items()},
+            {pk: sorted(ids) for pk, ids in rebuilt.ingredients.items()},
+        )
+
+    def test_lookups(self):
+        first, second = self.recipes
+        self.assertEqual(
+            self.index.with_all(self.ids(1)), {first.pk, second.pk}
+        )
+        self.assertEqual(self.index.with_all(self.ids(0, 1)), {first.pk})
+        self.assertEqual(
+            self.index.with_any(self.ids(0, 2)), {first.pk, second.pk}
+        )
+        self.assertEqual(
+            self.index.rank(self.ids(1, 2)), [(second.pk, 1), (first.pk, 0.5)]
+        )
+
+    def test_changes_are_applied_without_rebuild(self):
+        self.index._get_snapshot()
+        first, second = self.recipes
+        RecipeIngredient.objects.filter(recipe=first).delete()
+        RecipeIngredient.objects.create(
+            recipe=first, ingredient=self.ingredients[3], amount=1
+        )
+        self.index.record_change(first.pk)
+        added = self.create_recipe(self.author, self.ingredients[:1])
+        self.index.record_change(added.pk)
+        second_pk = second.pk
+        second.delete()
+        self.index.record_change(second_pk)
+
+        with mock.patch.object(
+            RecipeIngredientIndex, '_build', side_effect=AssertionError
+        ), self.assertNumQueries(1):
+            self.assertEqual(self.index.with_any(self.ids(0)), {added.pk})
+        self.assertEqual(self.index.with_any(self.ids(1, 2)), set())
+        self.assertEqual(self.index.with_all(self.ids(3)), {first.pk})
+        self.assert_same_as_rebuilt()
+
+    def test_invalidate_rebuilds(self):
+        self.index._get_snapshot()
+        RecipeIngredient.objects.filter(recipe=self.recipes[0]).delete()
+        self.index.invalidate()
+        with mock.patch.object(
+            RecipeIngredientIndex, '_build', wraps=self.index._build
+        ) as build:
+            self.assertEqual(self.index.with_any(self.ids(0)), set())
+        build.assert_called_once()
+        self.assert_same_as_rebuilt()
+
+
+class RecipeIngredientsFilterTests(FoodgramTestCase):
+    url = '/api/recipes/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        author = cls.create_user('author')
+        cls.ingredients = list(Ingredient.objects.order_by('pk')[:3])
+        first, second, third = cls.ingredients
+        for name, ingredients in (
+            ('first', (first,)),
+            ('first-second', (first, second)),
+            ('first-second-third', (first, second, third)),
+            ('third', (third,)),
+        ):
+            cls.create_recipe(author, ingredients, name=name)
+
+    def get_names(self, **params):
+        data = self.client.get(self.url, {'limit': 10, **params}).json()
+        names = {recipe['name'] for recipe in data['results']}
+        self.assertEqual(data['count'], len(names))
+        return names
+
+    def check_filters(self):
+        first, second, third = (
+            ingredient.pk for ingredient in self.ingredients
+        )
+        self.assertEqual(
+            self.get_names(ingredients=[first, second]),
+            {'first-second', 'first-second-third'},
+        )
+        self.assertEqual(
+            self.get_names(ingredients=[first], exclude_ingredients=[third]),
+            {'first', 'first-second'},
+        )
+        self.assertEqual(
+            self.get_names(exclude_ingredients=[second]), {'first', 'third'}
+        )
+
+    def test_filters(self):
+        self.check_filters()
+
+    def test_filters_without_recipe_ids(self):
+        # Recipe ids matched by the index are replaced by EXISTS subqueries.
+        with mock.patch('recipes.filters.RecipeFilter.max_recipe_ids', 0):
+            self.check_filters()
+
+    def test_recipe_writes_are_recorded_on_commit(self):
+        first = self.ingredients[0].pk
+        self.assertEqual(len(self.get_names(ingredients=[first])), 3)
+        author = self.create_user('writer')
+        client = self.client_for(author)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(
+                self.url, self.recipe_payload(1, name='new'), format='json'
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('new', self.get_names(ingredients=[first]))
+        with self.captureOnCommitCallbacks(execute=True):
+            client.delete(f"{self.url}{response.json()['id']}/")
+        self.assertNotIn('new', self.get_names(ingredients=[first]))
+
+
+@unittest.skipUnless(
+    os.environ.get('FOODGRAM_BENCHMARKS'),
+    'set FOODGRAM_BENCHMARKS=1 to run the benchmarks',
+)
+class RecipeIngredientsFilterBenchmark(FoodgramTestCase):
+    recipes_count = 10_000
+    ingredients_per_recipe = 5
+    rounds = 20
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        author = cls.create_user('author')
+        cls.ingredient_ids = list(
+            Ingredient.objects.order_by('pk').values_list('pk', flat=True)[
+                :200
+            ]
+        )
+        Recipe.objects.bulk_create(
+            [
+                Recipe(
+                    author=author,
+                    name=str(number),
+                    text='Текст рецепта',
+                    image='recipe.png',
+                    cooking_time=5,
+                )
+                for number in range(cls.recipes_count)
+            ],
+            batch_size=1000,
+        )
+        count = len(cls.ingredient_ids)
+        RecipeIngredient.objects.bulk_create(
+            [
+                RecipeIngredient(
+                    recipe_id=recipe_id,
+                    ingredient_id=cls.ingredient_ids[
+                        (number * 7 + step * 31) % count
+                    ],
+                    amount=1,
+                )
+                for number, recipe_id in enumerate(
+                    Recipe.objects.values_list('pk', flat=True)
+                )
+                for step in range(cls.ingredients_per_recipe)
+            ],
+            batch_size=1000,
+        )
+
+    def measure(self, params):
+        started = time.perf_counter()
+        for _ in range(self.rounds):
+            queryset = RecipeFilter(params, Recipe.objects.all()).qs
+            page = [recipe.pk for recipe in queryset[:6]]
+            count = queryset.count()
+        elapsed = time.perf_counter() - started
+        return page, count, self.rounds / elapsed
+
+    def test_index_is_faster(self):
+        params = {
+            'ingredients': [self.ingredient_ids[0], self.ingredient_ids[31]],
+            'exclude_ingredients': [self.ingredient_ids[62]],
+        }
+        recipe_ingredient_index.with_any(())
+        *indexed, index = self.measure(params)
+        with mock.patch.object(RecipeFilter, 'max_recipe_ids', 0):
+            *existing, exists = self.measure(params)
+        self.assertEqual(indexed, existing)
+        self.assertTrue(indexed[1])
+        print(
+            f'\npages/s: EXISTS {exists:.0f}, index {index:.0f} '
+            f'(x{index / exists:.1f})'
+        )
+        self.assertGreater(index, exists)
@@ -0,0 +1,55 @@
+from django.core.files.base import ContentFile
+from django.db import transaction
+
+from recipes.models import Recipe
+from recipes.tests.base import FoodgramTestCase, image_bytes
+
+
+class RecipeSaveTests(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        author = self.create_user('author')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe = Recipe(
+                author=author, name='Рецепт', text='Текст', cooking_time=5
+            )
+            self.recipe.image.save('first.png', ContentFile(image_bytes()))
+        self.storage = self.recipe.image.storage
+
+    def test_save_is_a_single_update(self):
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        recipe.name = 'Другой рецепт'
+        with self.assertNumQueries(1) as context:
+            recipe.save()
+        self.assertTrue(
+            context.captured_queries[0]['sql'].startswith('UPDATE')
+        )
+
+    def test_save_with_deferred_image_is_a_single_update(self):
+        recipe = Recipe.objects.only('name').get(pk=self.recipe.pk)
+        recipe.name = 'Другой рецепт'
+        with self.assertNumQueries(1):
+            recipe.save()
+
+    def test_replaced_image_is_deleted_on_commit(self):
+        old_name = self.recipe.image.name
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.image.save('second.png', ContentFile(image_bytes()))
+            self.assertTrue(self.storage.exists(old_name))
+        self.assertFalse(self.storage.exists(old_name))
+        self.assertTrue(self.storage.exists(recipe.image.name))
+
+    def test_replaced_image_is_kept_on_rollback(self):
+        old_name = self.recipe.image.name
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    recipe.image.save('second.png', ContentFile(image_bytes()))
+                    raise RuntimeError
+        self.assertEqual(callbacks, [])
+        self.assertTrue(self.storage.exists(old_name))
+        self.assertEqual(
+            Recipe.objects.get(pk=self.recipe.pk).image.name, old_name
+        )
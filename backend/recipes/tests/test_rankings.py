@@ -0,0 +1,102 @@
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.utils import timezone
+
+from recipes.models import FavoriteRecipe, RecipeRanking, ShoppingCart
+from recipes.rankings import RESCAN_WINDOW, refresh_rankings
+from recipes.tests.base import FoodgramTestCase
+
+
+class RefreshRankingsTests(FoodgramTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        author = cls.create_user('author')
+        cls.users = [cls.create_user(f'user{number}') for number in range(3)]
+        cls.recipes = [
+            cls.create_recipe(author, name=f'recipe{number}')
+            for number in range(3)
+        ]
+
+    def add_event(self, model, user, recipe, age=timedelta()):
+        event = model.objects.create(user=user, recipe=recipe)
+        if age:
+            model.objects.filter(pk=event.pk).update(
+                created_at=timezone.now() - age
+            )
+        return event
+
+    def get_scores(self):
+        return dict(
+            RecipeRanking.objects.values_list('recipe_id', 'trending_score')
+        )
+
+    def assert_same_as_full_refresh(self):
+        scores = self.get_scores()
+        refresh_rankings(full=True)
+        full_scores = self.get_scores()
+        self.assertEqual(scores.keys(), full_scores.keys())
+        for recipe_id, score in full_scores.items():
+            self.assertAlmostEqual(scores[recipe_id], score)
+
+    def test_incremental_refresh_matches_full_refresh(self):
+        first, second, third = self.recipes
+        self.add_event(FavoriteRecipe, self.users[0], first, timedelta(days=3))
+        self.add_event(ShoppingCart, self.users[0], second, timedelta(days=1))
+        refresh_rankings()
+        self.add_event(FavoriteRecipe, self.users[1], first)
+        self.add_event(FavoriteRecipe, self.users[1], third)
+        refresh_rankings()
+        self.assert_same_as_full_refresh()
+
+    def test_late_event_is_counted(self):
+        first, second, _ = self.recipes
+        self.add_event(FavoriteRecipe, self.users[0], first)
+        refresh_rankings()
+        # Created before the newest processed event, committed after it.
+        self.add_event(
+            FavoriteRecipe, self.users[1], second, RESCAN_WINDOW / 2
+        )
+        refresh_rankings()
+        self.assertIn(second.pk, self.get_scores())
+        self.assert_same_as_full_refresh()
+
+    def test_removed_events_of_active_recipes_are_dropped(self):
+        first, second, _ = self.recipes
+        self.add_event(FavoriteRecipe, self.users[0], first)
+        favorite = self.add_event(FavoriteRecipe, self.users[0], second)
+        self.add_event(FavoriteRecipe, self.users[1], second)
+        refresh_rankings()
+        favorite.delete()
+        self.add_event(ShoppingCart, self.users[0], second)
+        refresh_rankings()
+        self.assert_same_as_full_refresh()
+
+    def test_trending_ordering(self):
+        first, second, third = self.recipes
+        self.add_event(FavoriteRecipe, self.users[0], first, timedelta(days=9))
+        self.add_event(FavoriteRecipe, self.users[1], first, timedelta(days=9))
+        self.add_event(ShoppingCart, self.users[0], second)
+        self.add_event(FavoriteRecipe, self.users[2], third, timedelta(days=1))
+        call_command('refresh_rankings', stdout=open('/dev/null', 'w'))
+        data = self.client.get(
+            '/api/recipes/', {'ordering': 'trending', 'limit': 10}
+        ).json()
+        self.assertEqual(
+            [recipe['name'] for recipe in data['results']],
+            ['recipe2', 'recipe1', 'recipe0'],
+        )
+
+    def test_unranked_recipes_come_last_in_trending(self):
+        first, second, third = self.recipes
+        self.add_event(FavoriteRecipe, self.users[0], first)
+        refresh_rankings()
+        data = self.client.get(
+            '/api/recipes/', {'ordering': 'trending', 'limit': 10}
+        ).json()
+        self.assertEqual(data['count'], 3)
+        self.assertEqual(
+            [recipe['id'] for recipe in data['results']],
+            [first.pk, third.pk, second.pk],
+        )
@@ -0,0 +1,90 @@
+from recipes.tests.base import FoodgramTestCase
+
+
+class RecipeRetrieveTests(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = self.create_user('author')
+        self.client = self.client_for(self.author)
+        self.recipe = self.create_recipe(self.author, tags=self.tags[:1])
+
+    def get(self, recipe_id):
+        return self.client.get(f'/api/recipes/{recipe_id}/')
+
+    def test_id_spellings_share_the_cached_body(self):
+        self.assertEqual(self.get(f'0{self.recipe.pk}').status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f'/api/recipes/{self.recipe.pk}/', {'name': 'Новое'}
+            )
+        self.assertEqual(response.status_code, 200)
+        for recipe_id in (self.recipe.pk, f'0{self.recipe.pk}'):
+            with self.subTest(recipe_id=recipe_id):
+                response = self.get(recipe_id)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()['id'], self.recipe.pk)
+                self.assertEqual(response.json()['name'], 'Новое')
+
+    def test_invalid_id(self):
+        for recipe_id in ('abc', self.recipe.pk + 1):
+            with self.subTest(recipe_id=recipe_id):
+                self.assertEqual(self.get(recipe_id).status_code, 404)
+
+
+class CachedListTests(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        author = self.create_user('author')
+        self.author = author
+        self.reader = self.create_user('reader')
+        self.recipes = [
+            self.create_recipe(author, tags=self.tags[:1], name=name)
+            for name in ('first', 'second')
+        ]
+
+    def names(self, **params):
+        response = self.client.get('/api/recipes/', {'limit': 10, **params})
+        self.assertEqual(response.status_code, 200)
+        return [recipe['name'] for recipe in response.json()['results']]
+
+    def test_recipe_edit_invalidates_the_list(self):
+        self.assertEqual(self.names(), ['second', 'first'])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client_for(self.author).patch(
+                f'/api/recipes/{self.recipes[0].pk}/', {'name': 'renamed'}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.names(), ['second', 'renamed'])
+
+    def test_favorite_toggle_invalidates_the_list(self):
+        self.assertEqual(self.names(ordering='popular'), ['second', 'first'])
+        url = f'/api/recipes/{self.recipes[0].pk}/favorite/'
+        client = self.client_for(self.reader)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(client.post(url).status_code, 201)
+        self.assertEqual(self.names(ordering='popular'), ['first', 'second'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(client.delete(url).status_code, 204)
+        self.assertEqual(self.names(ordering='popular'), ['second', 'first'])
+
+    def test_host_header_does_not_poison_the_cache(self):
+        for url in ('/api/recipes/?limit=1', '/api/users/?limit=1'):
+            with self.subTest(url=url):
+                poisoned = self.client.get(url, HTTP_HOST='evil.example')
+                self.assertEqual(poisoned.status_code, 200)
+                self.assertIn(b'evil.example', poisoned.content)
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn(b'evil.example', response.content)
+
+    def test_cursor_with_another_ordering_is_rejected(self):
+        for params in ({'ordering': 'popular'}, {'search': 'first'}):
+            with self.subTest(**params):
+                response = self.client.get(
+                    '/api/recipes/', {'cursor': '', **params}
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('cursor', response.json())
+        response = self.client.get('/api/recipes/', {'cursor': ''})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 2)
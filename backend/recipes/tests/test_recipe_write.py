@@ -0,0 +1,123 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# Imported before recipes.serializers, which otherwise runs into the
+# circular import between the recipes and users serializers.
+import users.serializers  # noqa: F401
+from recipes.models import Ingredient
+from recipes.serializers import RecipeSerializer
+from recipes.tests.base import FoodgramTestCase
+
+
+class RecipeCreateQueriesTests(FoodgramTestCase):
+    url = '/api/recipes/'
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.create_user('author')
+        self.client = self.client_for(self.author)
+        # Warm up the per-user caches of the favorite and cart ids.
+        self.count_create_queries(self.recipe_payload())
+
+    def count_create_queries(self, payload):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        return len(context)
+
+    def test_query_count_does_not_depend_on_ingredients_count(self):
+        counts = [
+            self.count_create_queries(self.recipe_payload(ingredients_count))
+            for ingredients_count in (1, 5, 25)
+        ]
+        self.assertEqual(counts, [counts[0]] * 3)
+
+    def test_query_count_does_not_depend_on_tags_count(self):
+        counts = [
+            self.count_create_queries(self.recipe_payload(tags=self.tags[:n]))
+            for n in (1, 3)
+        ]
+        self.assertEqual(counts[0], counts[1])
+
+    def test_unknown_ids_are_reported_per_item(self):
+        payload = self.recipe_payload(3)
+        payload['ingredients'][1]['id'] = 999_999
+        payload['tags'] = [self.tags[0].pk, 999_999]
+        response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()
+        self.assertEqual(errors['ingredients'][0], {})
+        self.assertIn('id', errors['ingredients'][1])
+        self.assertIn('999999', errors['tags'][0])
+
+    def test_duplicate_ingredients_are_rejected(self):
+        payload = self.recipe_payload(3)
+        payload['ingredients'][2]['id'] = payload['ingredients'][0]['id']
+        response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ingredients', response.json())
+
+
+class RecipeUpdateWritesTests(FoodgramTestCase):
+    # Updates read the current rows, then write only the difference: at
+    # most one delete, one insert and one update.
+
+    def setUp(self):
+        super().setUp()
+        self.ingredients = list(Ingredient.objects.order_by('pk')[:4])
+        self.recipe = self.create_recipe(
+            self.create_user('author'), self.ingredients[:3], self.tags[:2]
+        )
+        self.serializer = RecipeSerializer()
+
+    def set_ingredients(self, amounts):
+        self.serializer._set_ingredients(
+            self.recipe,
+            [
+                {'ingredient': self.ingredients[number], 'amount': amount}
+                for number, amount in amounts.items()
+            ],
+        )
+
+    def assert_ingredients(self, amounts):
+        self.assertEqual(
+            dict(
+                self.recipe.recipe_ingredients.values_list(
+                    'ingredient_id', 'amount'
+                )
+            ),
+            {
+                self.ingredients[number].pk: amount
+                for number, amount in amounts.items()
+            },
+        )
+
+    def assert_tags(self, tags):
+        self.assertEqual(
+            set(self.recipe.tags.all()), {self.tags[number] for number in tags}
+        )
+
+    def test_unchanged_ingredients(self):
+        with self.assert_num_statements(1):
+            self.set_ingredients({0: 1, 1: 1, 2: 1})
+        self.assert_ingredients({0: 1, 1: 1, 2: 1})
+
+    def test_amount_only_change(self):
+        with self.assert_num_statements(2):
+            self.set_ingredients({0: 1, 1: 5, 2: 7})
+        self.assert_ingredients({0: 1, 1: 5, 2: 7})
+
+    def test_mixed_ingredient_changes(self):
+        with self.assert_num_statements(4):
+            self.set_ingredients({1: 1, 2: 3, 3: 4})
+        self.assert_ingredients({1: 1, 2: 3, 3: 4})
+
+    def test_unchanged_tags(self):
+        with self.assert_num_statements(1):
+            self.serializer._set_tags(self.recipe, self.tags[:2])
+        self.assert_tags((0, 1))
+
+    def test_mixed_tag_changes(self):
+        with self.assert_num_statements(3):
+            self.serializer._set_tags(self.recipe, self.tags[1:])
+        self.assert_tags((1, 2))
@@ -0,0 +1,134 @@
+import os
+import time
+import unittest
+
+from django.contrib.auth.models import AnonymousUser
+from rest_framework import serializers
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+# Imported before recipes.serializers, which otherwise runs into the
+# circular import between the recipes and users serializers.
+import users.serializers  # noqa: F401
+from recipes.models import Ingredient, Recipe
+from recipes.serializers import CookableRecipeSerializer, RecipeSerializer
+from recipes.tests.base import FoodgramTestCase
+from users.models import Follow
+
+
+class PlainRecipeSerializer(RecipeSerializer):
+    to_representation = serializers.ModelSerializer.to_representation
+
+
+class PlainCookableRecipeSerializer(CookableRecipeSerializer):
+    to_representation = serializers.ModelSerializer.to_representation
+
+
+class RepresentationTestCase(FoodgramTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.reader = cls.create_user('reader')
+        cls.author = cls.create_user('author')
+        Follow.objects.create(follower=cls.reader, follow_to=cls.author)
+        ingredients = list(Ingredient.objects.order_by('pk')[:20])
+        for number in range(8):
+            author = cls.author if number % 2 else cls.reader
+            recipe = cls.create_recipe(
+                author,
+                ingredients[number:][: number + 1],
+                cls.tags[: number % 3 + 1],
+                name=f'Рецепт {number}',
+            )
+            if number % 3:
+                Recipe.objects.filter(pk=recipe.pk).update(
+                    image_variants={
+                        'thumb': {
+                            'name': f'thumb{number}.webp',
+                            'width': 32,
+                            'height': 24,
+                        },
+                    }
+                )
+
+    def get_context(self, user):
+        request = Request(APIRequestFactory().get('/api/recipes/'))
+        request.user = user
+        recipe_ids = list(Recipe.objects.values_list('pk', flat=True))
+        return {
+            'request': request,
+            'favorite_recipe_ids': set(recipe_ids[::2]),
+            'cart_recipe_ids': set(recipe_ids[::3]),
+        }
+
+    def get_recipes(self, user, eager=True):
+        queryset = Recipe.objects
+        if eager:
+            queryset = queryset.setup_eager_loading(user)
+        queryset = queryset.order_by('-pk')
+        recipes = list(queryset)
+        for recipe in recipes:
+            recipe.coverage = 0.5
+        return recipes
+
+    def render(self, serializer_class, user, eager=True):
+        return serializer_class(
+            self.get_recipes(user, eager),
+            many=True,
+            context=self.get_context(user),
+        ).data
+
+
+class CompiledRepresentationTests(RepresentationTestCase):
+    serializer_pairs = (
+        (PlainRecipeSerializer, RecipeSerializer),
+        (PlainCookableRecipeSerializer, CookableRecipeSerializer),
+    )
+
+    def test_output_matches_drf(self):
+        for plain, compiled in self.serializer_pairs:
+            for user in (self.reader, self.author, AnonymousUser()):
+                for eager in (True, False):
+                    with self.subTest(
+                        serializer=compiled.__name__, user=user, eager=eager
+                    ):
+                        expected = self.render(plain, user, eager)
+                        self.assertTrue(expected)
+                        self.assertEqual(
+                            self.render(compiled, user, eager), expected
+                        )
+
+    def test_single_recipe_matches_drf(self):
+        recipe = self.get_recipes(self.reader)[0]
+        context = self.get_context(self.reader)
+        self.assertEqual(
+            RecipeSerializer(recipe, context=context).data,
+            PlainRecipeSerializer(recipe, context=context).data,
+        )
+
+
+@unittest.skipUnless(
+    os.environ.get('FOODGRAM_BENCHMARKS'),
+    'set FOODGRAM_BENCHMARKS=1 to run the benchmarks',
+)
+class CompiledRepresentationBenchmark(RepresentationTestCase):
+    rounds = 20
+    copies = 25
+
+    def measure(self, serializer_class):
+        recipes = self.get_recipes(self.reader) * self.copies
+        context = self.get_context(self.reader)
+        started = time.perf_counter()
+        for _ in range(self.rounds):
+            serializer_class(recipes, many=True, context=context).data
+        elapsed = time.perf_counter() - started
+        return self.rounds * len(recipes) / elapsed
+
+    def test_compiled_is_faster(self):
+        plain = self.measure(PlainRecipeSerializer)
+        compiled = self.measure(RecipeSerializer)
+        print(
+            f'\nrecipes/s: DRF {plain:.0f}, compiled {compiled:.0f} '
+            f'(x{compiled / plain:.1f})'
+        )
+        self.assertGreater(compiled, plain)
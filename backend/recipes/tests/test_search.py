@@ -0,0 +1,68 @@
+from unittest import skipUnless
+
+from django.db import connection
+
+from recipes.tests.base import FoodgramTestCase
+
+
+class RecipeSearchTests(FoodgramTestCase):
+    url = '/api/recipes/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        author = cls.create_user('author')
+        breakfast = cls.tags[0]
+        recipes = (
+            ('Борщ украинский', 'Свекла, капуста и мясо', ()),
+            ('Капустный пирог', 'Тесто и капуста', (breakfast,)),
+            ('Омлет', 'Яйца и молоко', (breakfast,)),
+            ('Мясной пирог', 'Тесто и мясо', ()),
+            ('Суп', 'Вода и пирог', ()),
+        )
+        for name, text, tags in recipes:
+            recipe = cls.create_recipe(author, tags=tags, name=name)
+            recipe.text = text
+            recipe.save(update_fields=('text',))
+
+    def search(self, text, **params):
+        response = self.client.get(
+            self.url, {'search': text, 'limit': 10, **params}
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        names = [recipe['name'] for recipe in data['results']]
+        self.assertEqual(data['count'], len(names))
+        return names
+
+    def test_name_matches_rank_first(self):
+        names = self.search('пирог')
+        self.assertEqual(set(names[:2]), {'Капустный пирог', 'Мясной пирог'})
+        self.assertEqual(names[2:], ['Суп'])
+
+    def test_every_word_must_match(self):
+        self.assertEqual(self.search('пирог мясо'), ['Мясной пирог'])
+        self.assertEqual(self.search('капуста тесто'), ['Капустный пирог'])
+
+    def test_no_match(self):
+        self.assertEqual(self.search('рыба'), [])
+
+    def test_combined_with_filters(self):
+        self.assertEqual(
+            self.search('пирог', tags='breakfast'), ['Капустный пирог']
+        )
+
+    def test_pages_follow_relevance(self):
+        names = []
+        for page in (1, 2, 3):
+            data = self.client.get(
+                self.url, {'search': 'пирог', 'limit': 1, 'page': page}
+            ).json()
+            self.assertEqual(data['count'], 3)
+            names += [recipe['name'] for recipe in data['results']]
+        self.assertEqual(names, self.search('пирог'))
+
+    @skipUnless(connection.vendor == 'postgresql', 'PostgreSQL only.')
+    def test_typos_in_names_are_tolerated(self):
+        self.assertEqual(self.search('Омлте'), ['Омлет'])
+        self.assertEqual(self.search('пироги'), self.search('пирог'))
@@ -0,0 +1,70 @@
+import csv
+import io
+import json
+
+from recipes.models import Ingredient, ShoppingCart
+from recipes.tests.base import FoodgramTestCase
+
+
+class DownloadShoppingCartTests(FoodgramTestCase):
+    url = '/api/recipes/download_shopping_cart/'
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('buyer')
+        self.client = self.client_for(self.user)
+
+    def fill_cart(self, ingredients_count):
+        ingredients = Ingredient.objects.order_by('pk')[:ingredients_count]
+        for name in ('first', 'second'):
+            recipe = self.create_recipe(self.user, ingredients, name=name)
+            ShoppingCart.objects.create(user=self.user, recipe=recipe)
+
+    def download(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_query_count_does_not_depend_on_cart_size(self):
+        self.fill_cart(2)
+        with self.assertNumQueries(1):
+            self.download()
+        self.fill_cart(80)
+        for file_format in ('txt', 'csv', 'json'):
+            with self.subTest(file_format=file_format):
+                with self.assertNumQueries(1):
+                    self.download(file_format=file_format)
+
+    def test_amounts_are_summed_per_ingredient(self):
+        self.fill_cart(3)
+        rows = json.loads(self.download(file_format='json'))
+        expected = [
+            {
+                'name': ingredient.name,
+                'measurement_unit': ingredient.measurement_unit.name,
+                'amount': 2,
+            }
+            for ingredient in Ingredient.objects.order_by('pk')[:3]
+        ]
+        self.assertEqual(rows, sorted(expected, key=lambda row: row['name']))
+
+        lines = self.download().splitlines()
+        self.assertEqual(
+            lines,
+            [f"{row['name']} ({row['measurement_unit']}) — 2" for row in rows],
+        )
+        reader = csv.reader(io.StringIO(self.download(file_format='csv')))
+        self.assertEqual(
+            list(reader),
+            [['name', 'measurement_unit', 'amount']]
+            + [[row['name'], row['measurement_unit'], '2'] for row in rows],
+        )
+
+    def test_empty_cart(self):
+        self.assertEqual(self.download(file_format='json'), '[]')
+        self.assertEqual(self.download(), '')
+
+    def test_unknown_format(self):
+        response = self.client.get(self.url, {'file_format': 'pdf'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('file_format', response.json())
@@ -0,0 +1,95 @@
+from recipes.caches import cart_recipe_ids, favorite_recipe_ids
+from recipes.models import FavoriteRecipe, Recipe, ShoppingCart
+from recipes.tests.base import FoodgramTestCase
+
+
+class RecipeToUserToggleTests(FoodgramTestCase):
+    lists = (
+        ('favorite', FavoriteRecipe, 'favorites list'),
+        ('shopping_cart', ShoppingCart, 'shopping cart'),
+    )
+    # Queries of each request: the recipe lookup, then one statement for
+    # the row, then the counter update of the favorites only.
+    statements = {
+        'favorite': {'add': 3, 'add again': 2, 'remove': 2},
+        'shopping_cart': {'add': 2, 'add again': 2, 'remove': 1},
+    }
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('user')
+        self.client = self.client_for(self.user)
+        self.recipe = self.create_recipe(self.user)
+
+    def test_add_and_remove(self):
+        for path, model, list_name in self.lists:
+            url = f'/api/recipes/{self.recipe.pk}/{path}/'
+            with self.subTest(path=path):
+                response = self.client.post(url)
+                self.assertEqual(response.status_code, 201)
+                self.assertEqual(response.json()['id'], self.recipe.pk)
+                self.assertEqual(response.json()['name'], self.recipe.name)
+
+                response = self.client.post(url)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(
+                    model.objects.filter(recipe=self.recipe).count(), 1
+                )
+
+                self.assertEqual(self.client.delete(url).status_code, 204)
+                response = self.client.delete(url)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(
+                    response.json()['non_field_errors'],
+                    [f'The recipe does not exist in your {list_name}.'],
+                )
+                self.assertFalse(model.objects.exists())
+
+    def test_favorites_count_follows_toggles(self):
+        url = f'/api/recipes/{self.recipe.pk}/favorite/'
+        self.client.post(url)
+        self.client.post(url)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 1)
+        self.client.delete(url)
+        self.client.delete(url)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 0)
+
+    def test_missing_recipe(self):
+        missing_id = Recipe.objects.latest('pk').pk + 1
+        for path, _, _ in self.lists:
+            url = f'/api/recipes/{missing_id}/{path}/'
+            with self.subTest(path=path):
+                self.assertEqual(self.client.post(url).status_code, 404)
+                self.assertEqual(self.client.delete(url).status_code, 404)
+
+    def test_statement_counts(self):
+        for path, _, _ in self.lists:
+            url = f'/api/recipes/{self.recipe.pk}/{path}/'
+            statements = self.statements[path]
+            with self.subTest(path=path):
+                with self.assert_num_statements(statements['add']):
+                    self.assertEqual(self.client.post(url).status_code, 201)
+                with self.assert_num_statements(statements['add again']):
+                    self.assertEqual(self.client.post(url).status_code, 400)
+                with self.assert_num_statements(statements['remove']):
+                    self.assertEqual(self.client.delete(url).status_code, 204)
+                # The DELETE, then the recipe lookup telling 400 from 404.
+                with self.assert_num_statements(2):
+                    self.assertEqual(self.client.delete(url).status_code, 400)
+
+    def test_recipe_ids_are_invalidated(self):
+        for path, recipe_ids in (
+            ('favorite', favorite_recipe_ids),
+            ('shopping_cart', cart_recipe_ids),
+        ):
+            url = f'/api/recipes/{self.recipe.pk}/{path}/'
+            with self.subTest(path=path):
+                self.assertEqual(recipe_ids.get(self.user), frozenset())
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.client.post(url)
+                self.assertEqual(recipe_ids.get(self.user), {self.recipe.pk})
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.client.delete(url)
+                self.assertEqual(recipe_ids.get(self.user), frozenset())
@@ -1,49 +1,221 @@
-from django.db.models import Sum
-from django.http import HttpResponse
-from rest_framework import permissions, views, viewsets
+import csv
+import json
+from functools import partial
 
-from .filters import IngredientFilter, RecipeFilter
-from .mixins import BaseRecipeToUserView
-from .models import FavoriteRecipe, Ingredient, Recipe, ShoppingCart, Tag
+from django.db.models import F, Sum
+from django.http import Http404, StreamingHttpResponse
+from django.utils.functional import SimpleLazyObject
+from rest_framework import exceptions, permissions, views, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from .caches import (
+    RECIPES_GENERATION,
+    USER_GENERATION,
+    cart_recipe_ids,
+    favorite_recipe_ids,
+    recipe_bodies,
+)
+from .feeds import FeedPagination
+from .filters import RecipeFilter
+from .indexes import ingredient_index, recipe_ingredient_index
+from .mixins import (
+    AnonymousCachedResponseMixin,
+    BaseRecipeToUserView,
+    CachedResponseMixin,
+)
+from .models import (
+    FavoriteRecipe,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Tag,
+)
 from .permissions import IsAuthor
 from .serializers import (
+    CookableQuerySerializer,
+    CookableRecipeSerializer,
     FavoriteRecipeSerializer,
     IngredientSerializer,
     RecipeSerializer,
     ShoppingCartSerializer,
     TagSerializer,
 )
-from users.paginations import PageNumberLimitPagination
+from users.caches import SubscriptionResolver
+from users.paginations import (
+    DefaultLimitPagination,
+    PageNumberOrKeysetPagination,
+)
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for Tag model."""
 
     serializer_class = TagSerializer
     queryset = Tag.objects.all()
     permission_classes = (permissions.AllowAny,)
+    cache_generation = 'tag'
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for Ingredient model."""
 
     serializer_class = IngredientSerializer
-    queryset = Ingredient.objects.select_related('measurement_unit')
     permission_classes = (permissions.AllowAny,)
-    filterset_class = IngredientFilter
+    cache_generation = ingredient_index.generation_name
+    cache_query_params = ('name',)
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            self._list_from_index, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            self._retrieve_from_index, request, *args, **kwargs
+        )
+
+    def _list_from_index(self, request, *args, **kwargs):
+        name = request.query_params.get('name', '')
+        return Response(ingredient_index.search(name))
 
+    def _retrieve_from_index(self, request, *args, **kwargs):
+        try:
+            ingredient = ingredient_index.get(int(kwargs['pk']))
+        except ValueError:
+            ingredient = None
+        if ingredient is None:
+            raise Http404
+        return Response(ingredient)
 
-class RecipeViewSet(viewsets.ModelViewSet):
+
+class RecipeViewSet(AnonymousCachedResponseMixin, viewsets.ModelViewSet):
     """ViewSet for Recipe model."""
 
     serializer_class = RecipeSerializer
     permission_classes = (permissions.IsAuthenticatedOrReadOnly & IsAuthor,)
-    pagination_class = PageNumberLimitPagination
+    pagination_class = PageNumberOrKeysetPagination
     filterset_class = RecipeFilter
+    cache_generation = (
+        RECIPES_GENERATION,
+        'tag',
+        ingredient_index.generation_name,
+    )
 
     def get_queryset(self):
         return Recipe.objects.setup_eager_loading(self.request.user)
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        user = self.request.user
+        context['favorite_recipe_ids'] = SimpleLazyObject(
+            partial(favorite_recipe_ids.get, user)
+        )
+        context['cart_recipe_ids'] = SimpleLazyObject(
+            partial(cart_recipe_ids.get, user)
+        )
+        return context
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Serve the recipe from the shared body cache, overlaying the fields
+        which depend on the viewer.
+        """
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            recipe_id = int(kwargs[lookup_url_kwarg])
+        except ValueError:
+            raise Http404
+        # Spellings like "01" must share the cache entry of "1".
+        self.kwargs[lookup_url_kwarg] = recipe_id
+        base_url = request.build_absolute_uri('/')
+        body = recipe_bodies.get(recipe_id, base_url)
+        if body is None:
+            generations = recipe_bodies.get_generations(
+                *recipe_bodies.generation_names(recipe_id)
+            )
+            instance = self.get_object()
+            generations.update(
+                recipe_bodies.get_generations(
+                    USER_GENERATION.format(instance.author_id)
+                )
+            )
+            body = self.get_serializer(instance).data
+            recipe_bodies.set(recipe_id, base_url, generations, body)
+        return Response(self._overlay_viewer_fields(body))
+
+    def _overlay_viewer_fields(self, body):
+        user = self.request.user
+        author = body['author']
+        resolver = SubscriptionResolver.for_request(self.request)
+        return {
+            **body,
+            'author': {
+                **author,
+                'is_subscribed': resolver.is_subscribed(author['id']),
+            },
+            'is_favorited': body['id'] in favorite_recipe_ids.get(user),
+            'is_in_shopping_cart': body['id'] in cart_recipe_ids.get(user),
+        }
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        self._reload_instance(serializer)
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        self._reload_instance(serializer)
+
+    @action(
+        detail=False,
+        serializer_class=CookableRecipeSerializer,
+        pagination_class=DefaultLimitPagination,
+    )
+    def cookable(self, request):
+        """
+        List recipes using any of the given `ingredients`, ranked by the
+        share of their ingredients found among them.
+        """
+        query_serializer = CookableQuerySerializer(
+            data={'ingredients': request.query_params.getlist('ingredients')}
+        )
+        query_serializer.is_valid(raise_exception=True)
+        ranked = recipe_ingredient_index.rank(
+            query_serializer.validated_data['ingredients']
+        )
+
+        page = self.paginate_queryset(ranked)
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for recipe_id, _ in page]
+        )
+        results = []
+        for recipe_id, coverage in page:
+            recipe = recipes.get(recipe_id)
+            if recipe is not None:
+                recipe.coverage = coverage
+                results.append(recipe)
+
+        serializer = self.get_serializer(results, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False,
+        permission_classes=(permissions.IsAuthenticated,),
+        pagination_class=FeedPagination,
+        filterset_class=None,
+    )
+    def feed(self, request):
+        """List recipes of the followed authors, newest first."""
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    def _reload_instance(self, serializer):
+        """Reload the saved recipe with eager loading for the response."""
+        serializer.instance = self.get_queryset().get(
+            pk=serializer.instance.pk
+        )
+
 
 class FavoriteRecipeToUserView(BaseRecipeToUserView):
     """View for create/destroy FavoriteRecipe model."""
@@ -51,6 +223,12 @@ class FavoriteRecipeToUserView(BaseRecipeToUserView):
     serializer_class = FavoriteRecipeSerializer
     queryset = FavoriteRecipe.objects.all()
     list_name = 'favorites list'
+    counter_field = 'favorites_count'
+    user_recipe_ids = favorite_recipe_ids
+    error_messages = {
+        **BaseRecipeToUserView.error_messages,
+        'already_in': 'The recipe has already been added to favorites.',
+    }
 
 
 class ShoppingCartToUserView(BaseRecipeToUserView):
@@ -59,38 +237,96 @@ class ShoppingCartToUserView(BaseRecipeToUserView):
     serializer_class = ShoppingCartSerializer
     queryset = ShoppingCart.objects.all()
     list_name = 'shopping cart'
+    user_recipe_ids = cart_recipe_ids
+    error_messages = {
+        **BaseRecipeToUserView.error_messages,
+        'already_in': (
+            'The recipe has already been added to the shopping cart.'
+        ),
+    }
 
 
 class DownloadShoppingCartView(views.APIView):
     """View for download shopping_cart_list file."""
 
-    file_name = 'shopping_cart_list.txt'
+    file_name = 'shopping_cart_list'
+    file_format_query_param = 'file_format'
+    file_formats = {
+        'txt': 'text/plain',
+        'csv': 'text/csv',
+        'json': 'application/json',
+    }
+    default_file_format = 'txt'
     permission_classes = (permissions.IsAuthenticated,)
 
     def get(self, request, *args, **kwargs):
-        return HttpResponse(self.get_content(), headers=self.get_headers())
+        file_format = self.get_file_format()
+        rows = self.get_queryset().iterator()
+        create_content = getattr(self, f'create_{file_format}_content')
+        return StreamingHttpResponse(
+            create_content(rows), headers=self.get_headers(file_format)
+        )
 
-    def get_headers(self):
+    def get_file_format(self):
+        file_format = self.request.query_params.get(
+            self.file_format_query_param, self.default_file_format
+        )
+        if file_format not in self.file_formats:
+            expected = ', '.join(f'`{name}`' for name in self.file_formats)
+            raise exceptions.ValidationError(
+                {
+                    self.file_format_query_param: [
+                        f'Unsupported value. Expected one of: {expected}'
+                    ]
+                }
+            )
+        return file_format
+
+    def get_headers(self, file_format):
+        file_name = f'{self.file_name}.{file_format}'
         return {
-            'Content-Type': 'text/plain',
-            'Content-Disposition': f'attachment; filename="{self.file_name}"',
+            'Content-Type': f'{self.file_formats[file_format]}; charset=utf-8',
+            'Content-Disposition': f'attachment; filename="{file_name}"',
         }
 
-    def get_content(self):
-        queryset = self.get_queryset()
-        content = '\n'.join(self.create_simple_ingredient_list(queryset))
-        return content
-
     def get_queryset(self):
         user = self.request.user
-        queryset = Ingredient.objects.filter(
-            recipeingredient__recipe__in_shoppingcart__user_id=user.id
-        ).annotate(amount=Sum('recipeingredient__amount'))
+        queryset = (
+            RecipeIngredient.objects.filter(
+                recipe__in_shoppingcart__user_id=user.id
+            )
+            .values(
+                name=F('ingredient__name'),
+                measurement_unit=F('ingredient__measurement_unit__name'),
+            )
+            .annotate(amount=Sum('amount'))
+            .order_by('name')
+        )
         return queryset
 
-    def create_simple_ingredient_list(self, ingredients_qs):
-        simple_ingredient_list = [
-            f"{obj.name} ({obj.measurement_unit.name}) — {obj.amount}"
-            for obj in ingredients_qs
-        ]
-        return simple_ingredient_list
+    def create_txt_content(self, rows):
+        for row in rows:
+            yield '{name} ({measurement_unit}) — {amount}\n'.format(**row)
+
+    def create_csv_content(self, rows):
+        writer = csv.writer(_EchoBuffer())
+        yield writer.writerow(('name', 'measurement_unit', 'amount'))
+        for row in rows:
+            yield writer.writerow(
+                (row['name'], row['measurement_unit'], row['amount'])
+            )
+
+    def create_json_content(self, rows):
+        separator = ''
+        yield '['
+        for row in rows:
+            yield separator + json.dumps(row, ensure_ascii=False)
+            separator = ','
+        yield ']'
+
+
+class _EchoBuffer:
+    """File-like object for `csv.writer` which returns written values."""
+
+    def write(self, value):
+        return value
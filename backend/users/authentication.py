@@ -0,0 +1,121 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router
+from rest_framework.authentication import TokenAuthentication
+
+from recipes.caches import get_generation
+
+AUTH_TOKEN_KEY = 'auth-token:{0}'
+AUTH_TOKEN_GENERATION = 'auth-token:{0}'
+
+
+def get_token_digest(key):
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication which caches tokens together with their users.
+
+    Tokens are kept in a bounded in-process LRU and in the shared cache.
+    Every entry is tied to the generation of its token, which is bumped
+    when the token is deleted (logout) or its user is saved (deactivation,
+    password change), so such changes apply on the next request in every
+    worker.
+
+    Only plain values of the non-sensitive user fields are cached: the
+    user is rebuilt with the password, the permission flags and the
+    counters deferred, so they are read from the database if ever used
+    and a `save()` of the user does not write them.
+    """
+
+    lru_size = 1024
+    lru_timeout = 60
+    cache_timeout = 300
+    uncached_user_fields = (
+        'password',
+        'last_login',
+        'is_superuser',
+        'is_staff',
+        'is_active',
+    )
+
+    _lru = OrderedDict()
+    _lru_lock = threading.Lock()
+
+    def authenticate_credentials(self, key):
+        digest = get_token_digest(key)
+        generation = get_generation(AUTH_TOKEN_GENERATION.format(digest))
+        cache_key = AUTH_TOKEN_KEY.format(digest)
+
+        data = self._lru_get(cache_key, generation)
+        if data is None:
+            entry = cache.get(cache_key)
+            if entry is not None and entry[0] == generation:
+                data = entry[1]
+                self._lru_set(cache_key, generation, data)
+        if data is not None and data[0] == self.get_cached_user_fields():
+            return self.load_credentials(key, data)
+
+        user, token = super().authenticate_credentials(key)
+        data = self.dump_credentials(user, token)
+        cache.set(cache_key, (generation, data), self.cache_timeout)
+        self._lru_set(cache_key, generation, data)
+        return user, token
+
+    def get_cached_user_fields(self):
+        User = get_user_model()
+        uncached = {*self.uncached_user_fields, *User.counter_fields}
+        return tuple(
+            field.attname
+            for field in User._meta.concrete_fields
+            if field.attname not in uncached
+        )
+
+    def dump_credentials(self, user, token):
+        """Return the cached data of `token`, which is made of plain values."""
+        names = self.get_cached_user_fields()
+        values = tuple(getattr(user, name) for name in names)
+        return names, values, token.created
+
+    def load_credentials(self, key, data):
+        names, values, created = data
+        User = get_user_model()
+        user = User.from_db(router.db_for_read(User), names, values)
+        Token = self.get_model()
+        token_values = {'key': key, 'user_id': user.pk, 'created': created}
+        token_fields = [field.attname for field in Token._meta.concrete_fields]
+        token = Token.from_db(
+            router.db_for_read(Token),
+            token_fields,
+            [token_values[name] for name in token_fields],
+        )
+        token.user = user
+        return user, token
+
+    @classmethod
+    def _lru_get(cls, cache_key, generation):
+        with cls._lru_lock:
+            entry = cls._lru.get(cache_key)
+            if entry is None:
+                return None
+            expires_at, entry_generation, data = entry
+            if entry_generation != generation or expires_at < time.monotonic():
+                del cls._lru[cache_key]
+                return None
+            cls._lru.move_to_end(cache_key)
+            return data
+
+    @classmethod
+    def _lru_set(cls, cache_key, generation, data):
+        expires_at = time.monotonic() + cls.lru_timeout
+        with cls._lru_lock:
+            cls._lru[cache_key] = (expires_at, generation, data)
+            cls._lru.move_to_end(cache_key)
+            while len(cls._lru) > cls.lru_size:
+                cls._lru.popitem(last=False)
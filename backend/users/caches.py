@@ -0,0 +1,65 @@
+from django.core.cache import cache
+
+from .models import Follow
+from .signals import FOLLOW_GENERATION
+from recipes.caches import get_generation
+
+FOLLOWED_IDS_KEY = 'followed-ids:{0}:{1}'
+FOLLOWED_IDS_TIMEOUT = 86400
+
+
+def get_followed_ids(user):
+    """
+    Return the frozenset of ids of the users `user` follows.
+
+    The set is cached under the follow generation of the user, which is
+    bumped on every follow and unfollow.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+    key = FOLLOWED_IDS_KEY.format(
+        user.id, get_generation(FOLLOW_GENERATION.format(user.id))
+    )
+    followed_ids = cache.get(key)
+    if followed_ids is None:
+        followed_ids = frozenset(
+            Follow.objects.filter(follower_id=user.id)
+            .order_by()
+            .values_list('follow_to_id', flat=True)
+        )
+        cache.set(key, followed_ids, FOLLOWED_IDS_TIMEOUT)
+    return followed_ids
+
+
+class SubscriptionResolver:
+    """
+    Answers whether the user of a request follows other users.
+
+    The followed ids are loaded at most once per request, so any number
+    of users is resolved without further queries.
+    """
+
+    attribute_name = '_subscription_resolver'
+
+    def __init__(self, user):
+        self.user = user
+        self._followed_ids = None
+
+    @classmethod
+    def for_request(cls, request):
+        """Return the resolver of `request`, creating it on first use."""
+        resolver = getattr(request, cls.attribute_name, None)
+        if resolver is None or resolver.user is not request.user:
+            resolver = cls(request.user)
+            setattr(request, cls.attribute_name, resolver)
+        return resolver
+
+    @classmethod
+    def reset(cls, request):
+        """Drop the ids loaded by `request`, e.g. after it changed them."""
+        setattr(request, cls.attribute_name, None)
+
+    def is_subscribed(self, user_id):
+        if self._followed_ids is None:
+            self._followed_ids = get_followed_ids(self.user)
+        return user_id in self._followed_ids
@@ -16,22 +16,53 @@ class BaseModel(models.Model):
         abstract = True
 
 
+def exclude_from_full_save(instance, kwargs, field_names):
+    """
+    Turn a full save of a loaded `instance` into an update of its loaded
+    fields but `field_names`, i.e. the columns maintained in the database
+    (counters shifted with `F()`, data written by background jobs), whose
+    values loaded with the instance may be stale by now.
+    """
+    if (
+        instance._state.adding
+        or kwargs.get('force_insert')
+        or kwargs.get('update_fields') is not None
+    ):
+        return
+    deferred = instance.get_deferred_fields()
+    kwargs['update_fields'] = [
+        field.attname
+        for field in instance._meta.concrete_fields
+        if not field.primary_key
+        and field.attname not in deferred
+        and field.name not in field_names
+    ]
+
+
 class User(AbstractUser):
     """User model."""
 
     first_name = models.CharField(_('first name'), max_length=150)
     last_name = models.CharField(_('last name'), max_length=150)
     email = models.EmailField(_('email address'), unique=True)
+    recipes_count = models.PositiveIntegerField(default=0, editable=False)
+    followers_count = models.PositiveIntegerField(default=0, editable=False)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
 
     objects = UserManager()
 
+    counter_fields = ('recipes_count', 'followers_count')
+
     class Meta(AbstractUser.Meta):
         db_table = 'auth_user'
         ordering = ('-date_joined',)
 
+    def save(self, *args, **kwargs):
+        exclude_from_full_save(self, kwargs, self.counter_fields)
+        return super().save(*args, **kwargs)
+
 
 class Follow(BaseModel):
     """Follow model."""
@@ -1,5 +1,263 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
+import hashlib
+import json
+from collections import OrderedDict
+from functools import partial
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+from rest_framework import exceptions
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    BasePagination,
+    PageNumberPagination,
+    _positive_int,
+)
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 
 class PageNumberLimitPagination(PageNumberPagination):
     page_size_query_param = 'limit'
+
+
+class DefaultLimitPagination(PageNumberLimitPagination):
+    """Page number pagination which paginates even without `limit`."""
+
+    page_size = 6
+    max_page_size = 100
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Paginator which caches the total count of a queryset for a short time.
+
+    Counts are keyed by the SQL of the filtered queryset, so every filter
+    combination gets its own entry. Unfiltered querysets over PostgreSQL
+    tables larger than `estimate_threshold` rows use the planner estimate
+    from `pg_class.reltuples` instead of a full scan.
+    """
+
+    def __init__(
+        self,
+        object_list,
+        per_page,
+        count_timeout=60,
+        estimate_threshold=None,
+        **kwargs,
+    ):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_timeout = count_timeout
+        self.estimate_threshold = estimate_threshold
+
+    @cached_property
+    def count(self):
+        if not self.count_timeout or not isinstance(
+            self.object_list, QuerySet
+        ):
+            return super().count
+        queryset = self.object_list.values('pk').order_by()
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        signature = f'{queryset.db}\n{sql}\n{params!r}'.encode()
+        key = 'count:' + hashlib.md5(signature).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = self._estimate_count() or super().count
+            cache.set(key, count, self.count_timeout)
+        return count
+
+    def _estimate_count(self):
+        queryset = self.object_list
+        query = queryset.query
+        if (
+            self.estimate_threshold is None
+            or query.where
+            or query.distinct
+            or query.is_sliced
+        ):
+            return None
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class '
+                'WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        if row is None or row[0] < self.estimate_threshold:
+            return None
+        return row[0]
+
+
+class CachedCountPagination(PageNumberLimitPagination):
+    """
+    Page number pagination with cached or estimated counts.
+
+    Views may override the defaults with the `count_cache_timeout` and
+    `count_estimate_threshold` attributes; a zero timeout disables the
+    cache and `None` threshold disables the estimates.
+    """
+
+    count_cache_timeout = 60
+    count_estimate_threshold = 100_000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.django_paginator_class = partial(
+            CachedCountPaginator,
+            count_timeout=getattr(
+                view, 'count_cache_timeout', self.count_cache_timeout
+            ),
+            estimate_threshold=getattr(
+                view, 'count_estimate_threshold', self.count_estimate_threshold
+            ),
+        )
+        return super().paginate_queryset(queryset, request, view)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Pagination by the position of the last item of the previous page.
+
+    The cursor holds the values of the `ordering` fields of that item, so
+    every page is a single indexed range scan: there is neither an OFFSET
+    nor a COUNT query. `ordering` must end with a unique field.
+
+    A queryset ordered otherwise, e.g. by a search score or an `ordering`
+    parameter, is rejected rather than silently reordered.
+    """
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    page_size = 6
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+    invalid_cursor_message = 'Invalid cursor.'
+    ordering_conflict_message = (
+        'The cursor cannot be combined with another ordering.'
+    )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        order_by = queryset.query.order_by
+        if order_by and tuple(order_by) != tuple(self.ordering):
+            raise exceptions.ValidationError(
+                {self.cursor_query_param: [self.ordering_conflict_message]}
+            )
+        queryset = queryset.order_by(*self.ordering)
+
+        position = self.decode_cursor(request, queryset.model)
+        if position is not None:
+            queryset = queryset.filter(self.get_position_filter(position))
+
+        results = list(queryset[: self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        results = results[: self.page_size]
+        self.next_position = None
+        if self.has_next:
+            self.next_position = self.get_position(results[-1])
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ('next', self.get_next_link()),
+                    ('results', data),
+                ]
+            )
+        )
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size,
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.next_position),
+        )
+
+    def get_position(self, obj):
+        return [
+            str(getattr(obj, field.lstrip('-'))) for field in self.ordering
+        ]
+
+    def get_position_filter(self, position):
+        """
+        Build `(a, b) < (x, y)` as `a <= x AND (a < x OR (a = x AND b < y))`,
+        with the comparison direction of every field taken from `ordering`.
+        The redundant bound on the first field lets the database turn the
+        condition into an index range scan.
+        """
+        condition = Q()
+        equal = {}
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        first = self.ordering[0]
+        lookup = 'lte' if first.startswith('-') else 'gte'
+        return Q(**{f'{first.lstrip("-")}__{lookup}': position[0]}) & condition
+
+    def encode_cursor(self, position):
+        data = json.dumps(position, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(data).decode()
+
+    def decode_cursor(self, request, model):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if len(position) != len(self.ordering):
+                raise ValueError
+            return [
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, position)
+            ]
+        except (TypeError, ValueError, binascii.Error, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+
+class PageNumberOrKeysetPagination(CachedCountPagination):
+    """
+    Page number pagination, switched to keyset pagination when the
+    `cursor` query parameter is passed (an empty value starts at the
+    first page).
+    """
+
+    keyset_pagination_class = KeysetPagination
+    cursor_query_param = KeysetPagination.cursor_query_param
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_pagination_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -1,8 +1,7 @@
-from .common import FollowSerializer, FollowToSerializer
+from .common import FollowToSerializer
 from .nested import UserSerializer
 
 __all__ = [
-    'FollowSerializer',
     'FollowToSerializer',
     'UserSerializer',
 ]
@@ -1,8 +1,7 @@
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
 
-from recipes.serializers import RecipeSerializer
-from users.models import Follow
+from recipes.serializers import RecipeShortSerializer
 from users.serializers.nested import UserSerializer
 
 User = get_user_model()
@@ -12,12 +11,19 @@ class FollowToSerializer(UserSerializer):
     """Serializer for User model on follow page."""
 
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.ReadOnlyField()
 
     class Meta(UserSerializer.Meta):
         fields = UserSerializer.Meta.fields + ('recipes', 'recipes_count')
 
     def get_recipes(self, obj):
+        try:
+            return RecipeShortSerializer(
+                obj.prefetched_recipes, many=True, context=self.context
+            ).data
+        except AttributeError:
+            pass
+
         requests = self.context['request']
         recipes = obj.recipes.all()
 
@@ -28,37 +34,9 @@ class FollowToSerializer(UserSerializer):
             except ValueError:
                 pass
 
-        fields = ('id', 'name', 'image', 'cooking_time')
-        return RecipeSerializer(recipes, many=True, fields=fields).data
+        return RecipeShortSerializer(
+            recipes, many=True, context=self.context
+        ).data
 
     def get_is_subscribed(self, obj):
         return True
-
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
-
-class FollowSerializer(serializers.ModelSerializer):
-    """Serializer for Follow model."""
-
-    follower = serializers.HiddenField(
-        default=serializers.CurrentUserDefault(),
-    )
-
-    class Meta:
-        model = Follow
-        fields = ('follower', 'follow_to')
-        validators = [
-            serializers.UniqueTogetherValidator(
-                queryset=model.objects.all(),
-                fields=['follower', 'follow_to'],
-                message='You are already a follower.',
-            )
-        ]
-
-    def validate(self, attrs):
-        if attrs['follow_to'] == attrs['follower']:
-            raise serializers.ValidationError(
-                'You cannot follow to yourself.',
-            )
-        return attrs
@@ -1,6 +1,8 @@
 from djoser.serializers import UserSerializer as DjoserUserSerializer
 from rest_framework import serializers
 
+from users.caches import SubscriptionResolver
+
 
 class UserSerializer(DjoserUserSerializer):
     """Base serializer for User model."""
@@ -14,7 +16,7 @@ class UserSerializer(DjoserUserSerializer):
         try:
             return obj.is_subscribed
         except AttributeError:
-            user = self.context['request'].user
-            if user.is_anonymous:
-                return False
-            return obj.follow_to.filter(follower=user).exists()
+            request = self.context['request']
+            return SubscriptionResolver.for_request(request).is_subscribed(
+                obj.pk
+            )
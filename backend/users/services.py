@@ -1,3 +1,6 @@
+from django.db import connections, router
+from django.db.models import F
+from django.db.models.functions import Greatest
 from rest_framework import exceptions
 
 
@@ -12,3 +15,58 @@ def clean_recipe_limit_param(request):
                 {'recipes_limit': ['Incorrect type. Expected `int` value']}
             )
     return
+
+
+def update_counter(model, pk, field_name, delta):
+    """Shift a denormalized counter column in place, never below zero."""
+    model.objects.filter(pk=pk).update(
+        **{field_name: Greatest(F(field_name) + delta, 0)}
+    )
+
+
+def insert_or_ignore(model, **values):
+    """
+    Insert a row with a single `INSERT ... ON CONFLICT DO NOTHING` and
+    return whether it was inserted. No signal is sent, so the caller
+    updates the counters and caches depending on the row.
+    """
+    instance = model(**values)
+    fields = [
+        field for field in model._meta.concrete_fields if not field.primary_key
+    ]
+    connection = connections[router.db_for_write(model)]
+    quote_name = connection.ops.quote_name
+    sql = 'INSERT INTO {0} ({1}) VALUES ({2}) ON CONFLICT DO NOTHING'.format(
+        quote_name(model._meta.db_table),
+        ', '.join(quote_name(field.column) for field in fields),
+        ', '.join(['%s'] * len(fields)),
+    )
+    params = [
+        field.get_db_prep_save(field.pre_save(instance, True), connection)
+        for field in fields
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount > 0
+
+
+def delete_matching(model, **values):
+    """
+    Delete the rows whose columns equal `values` with a single `DELETE`
+    and return whether any existed. As with `insert_or_ignore()`, no
+    signal is sent.
+    """
+    connection = connections[router.db_for_write(model)]
+    quote_name = connection.ops.quote_name
+    fields = [model._meta.get_field(name) for name in values]
+    sql = 'DELETE FROM {0} WHERE {1}'.format(
+        quote_name(model._meta.db_table),
+        ' AND '.join(f'{quote_name(field.column)} = %s' for field in fields),
+    )
+    params = [
+        field.get_db_prep_value(value, connection)
+        for field, value in zip(fields, values.values())
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount > 0
@@ -0,0 +1,77 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import AUTH_TOKEN_GENERATION, get_token_digest
+from .models import Follow
+from .services import update_counter
+from recipes.caches import USER_GENERATION, USERS_GENERATION, bump_generation
+
+User = get_user_model()
+
+FOLLOW_GENERATION = 'follow:{0}'
+
+
+def invalidate_token(key):
+    transaction.on_commit(
+        partial(
+            bump_generation,
+            AUTH_TOKEN_GENERATION.format(get_token_digest(key)),
+        )
+    )
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follows(instance, **kwargs):
+    transaction.on_commit(
+        partial(
+            bump_generation, FOLLOW_GENERATION.format(instance.follower_id)
+        )
+    )
+
+
+@receiver(post_save, sender=Follow)
+def count_created_follow(instance, created, raw, **kwargs):
+    if created and not raw:
+        update_counter(User, instance.follow_to_id, 'followers_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(instance, **kwargs):
+    update_counter(User, instance.follow_to_id, 'followers_count', -1)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user(instance, update_fields, **kwargs):
+    # Logging in saves `last_login` only, which is not shown anywhere.
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    transaction.on_commit(
+        partial(bump_generation, USER_GENERATION.format(instance.id))
+    )
+    transaction.on_commit(partial(bump_generation, USERS_GENERATION))
+
+
+@receiver(post_delete, sender=User)
+def invalidate_deleted_user(**kwargs):
+    transaction.on_commit(partial(bump_generation, USERS_GENERATION))
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(instance, created, **kwargs):
+    if created:
+        return
+    for key in Token.objects.filter(user_id=instance.id).values_list(
+        'key', flat=True
+    ):
+        invalidate_token(key)
@@ -0,0 +1,147 @@
+import os
+import time
+import unittest
+
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.tests.base import FoodgramTestCase
+from users.authentication import (
+    AUTH_TOKEN_KEY,
+    CachedTokenAuthentication,
+    get_token_digest,
+)
+
+
+class TokenTestCase(FoodgramTestCase):
+    url = '/api/users/me/'
+
+    def setUp(self):
+        super().setUp()
+        CachedTokenAuthentication._lru.clear()
+        self.log_in('user')
+
+    def log_in(self, username):
+        self.user = self.create_user(username)
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+
+class CachedTokenAuthenticationTests(TokenTestCase):
+    def get(self, other_worker=False):
+        if other_worker:
+            # Another process has an LRU of its own.
+            CachedTokenAuthentication._lru.clear()
+        return self.client.get(self.url)
+
+    def test_cached_token_saves_a_query(self):
+        # Also caches the followed ids of the user.
+        self.assertEqual(self.get().status_code, 200)
+        for other_worker in (False, True):
+            with self.subTest(other_worker=other_worker):
+                with self.assert_num_statements(0):
+                    response = self.get(other_worker)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()['email'], self.user.email)
+        cache.delete(AUTH_TOKEN_KEY.format(get_token_digest(self.token.key)))
+        with self.assert_num_statements(1):
+            self.assertEqual(self.get(other_worker=True).status_code, 200)
+
+    def test_sensitive_fields_are_not_cached(self):
+        self.get()
+        entry = cache.get(
+            AUTH_TOKEN_KEY.format(get_token_digest(self.token.key))
+        )
+        self.assertNotIn(self.user.password, repr(entry))
+        names = entry[1][0]
+        for name in CachedTokenAuthentication.uncached_user_fields:
+            self.assertNotIn(name, names)
+
+    def test_saving_cached_user_keeps_deferred_fields(self):
+        self.user.is_staff = True
+        self.user.save()
+        authentication = CachedTokenAuthentication()
+        authentication.authenticate_credentials(self.token.key)
+        user, token = authentication.authenticate_credentials(self.token.key)
+        self.assertEqual(token.user, user)
+        self.assertIn('password', user.get_deferred_fields())
+        user.first_name = 'Renamed'
+        user.save()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, 'Renamed')
+        self.assertTrue(self.user.is_staff)
+        self.assertTrue(self.user.check_password('secret-password'))
+
+    def assert_revoked(self, revoke):
+        for other_worker in (False, True):
+            with self.subTest(other_worker=other_worker):
+                self.log_in(f'user-{other_worker}')
+                self.assertEqual(self.get().status_code, 200)
+                with self.captureOnCommitCallbacks(execute=True):
+                    revoke()
+                self.assertEqual(self.get(other_worker).status_code, 401)
+
+    def test_logout(self):
+        self.assert_revoked(
+            lambda: self.assertEqual(
+                self.client.post('/api/auth/token/logout/').status_code, 204
+            )
+        )
+
+    def test_token_deletion(self):
+        self.assert_revoked(lambda: self.token.delete())
+
+    def test_deactivation(self):
+        def deactivate():
+            self.user.is_active = False
+            self.user.save()
+
+        self.assert_revoked(deactivate)
+
+    def test_password_change(self):
+        def change_password():
+            self.user.set_password('new-secret-password')
+            self.user.save()
+
+        for other_worker in (False, True):
+            with self.subTest(other_worker=other_worker):
+                self.get()
+                with self.captureOnCommitCallbacks(execute=True):
+                    change_password()
+                with self.assert_num_statements(1):
+                    self.assertEqual(self.get(other_worker).status_code, 200)
+
+
+@unittest.skipUnless(
+    os.environ.get('FOODGRAM_BENCHMARKS'),
+    'set FOODGRAM_BENCHMARKS=1 to run the benchmarks',
+)
+class CachedTokenAuthenticationBenchmark(TokenTestCase):
+    rounds = 2000
+
+    def measure(self, authentication):
+        authentication.authenticate_credentials(self.token.key)
+        started = time.perf_counter()
+        for _ in range(self.rounds):
+            authentication.authenticate_credentials(self.token.key)
+        return self.rounds / (time.perf_counter() - started)
+
+    def test_cached_is_faster(self):
+        with self.assert_num_statements(self.rounds + 1):
+            plain = self.measure(TokenAuthentication())
+        with self.assert_num_statements(1):
+            cached = self.measure(CachedTokenAuthentication())
+        CachedTokenAuthentication._lru.clear()
+        with self.assert_num_statements(1):
+            self.client.get(self.url)
+        with self.assert_num_statements(0):
+            self.client.get(self.url)
+        print(
+            f'\nauthentications/s: TokenAuthentication {plain:.0f}, '
+            f'cached {cached:.0f} (x{cached / plain:.1f}); '
+            'queries per GET /api/users/me/: 1 -> 0'
+        )
+        self.assertGreater(cached, plain)
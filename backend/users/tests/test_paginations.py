@@ -0,0 +1,190 @@
+import base64
+import os
+import time
+import unittest
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from recipes.models import Recipe
+from recipes.tests.base import FoodgramTestCase
+from users.paginations import (
+    CachedCountPagination,
+    CachedCountPaginator,
+    KeysetPagination,
+)
+
+User = get_user_model()
+
+
+class CachedCountPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for number in range(3):
+            User.objects.create_user(
+                email=f'user{number}@example.com',
+                username=f'user{number}',
+                password='secret-password',
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_count_is_cached_per_queryset(self):
+        queryset = User.objects.order_by('pk')
+        with self.assertNumQueries(1):
+            self.assertEqual(CachedCountPaginator(queryset, 2).count, 3)
+        with self.assertNumQueries(0):
+            self.assertEqual(CachedCountPaginator(queryset, 2).count, 3)
+        filtered = queryset.filter(username='user1')
+        with self.assertNumQueries(1):
+            self.assertEqual(CachedCountPaginator(filtered, 2).count, 1)
+
+    def test_empty_result_queryset(self):
+        for queryset in (User.objects.none(), User.objects.filter(pk__in=[])):
+            with self.subTest(queryset=queryset):
+                paginator = CachedCountPaginator(queryset, 2)
+                with self.assertNumQueries(0):
+                    self.assertEqual(paginator.count, 0)
+                self.assertEqual(list(paginator.page(1)), [])
+
+    def test_zero_timeout_disables_the_cache(self):
+        queryset = User.objects.order_by('pk')
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                CachedCountPaginator(queryset, 2, count_timeout=0).count
+
+
+class KeysetPaginationTests(FoodgramTestCase):
+    url = '/api/recipes/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        author = cls.create_user('author')
+        for number in range(11):
+            cls.create_recipe(author, name=str(number))
+        # Groups of recipes created at the same moment: the id breaks the
+        # ties.
+        now = timezone.now()
+        for recipe in Recipe.objects.all():
+            Recipe.objects.filter(pk=recipe.pk).update(
+                created_at=now - timedelta(minutes=recipe.pk % 3)
+            )
+
+    def walk(self, limit):
+        ids, url, params = [], self.url, {'cursor': '', 'limit': limit}
+        while url is not None:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            self.assertNotIn('count', data)
+            self.assertLessEqual(len(data['results']), limit)
+            ids.extend(recipe['id'] for recipe in data['results'])
+            url, params = data['next'], None
+        return ids
+
+    def test_walk_over_tied_positions(self):
+        expected = list(
+            Recipe.objects.order_by('-created_at', '-id').values_list(
+                'id', flat=True
+            )
+        )
+        for limit in (1, 2, 3, 4, 11, 20):
+            with self.subTest(limit=limit):
+                self.assertEqual(self.walk(limit), expected)
+
+    def test_first_page_matches_page_numbers(self):
+        by_cursor = self.client.get(self.url, {'cursor': '', 'limit': 5})
+        by_page = self.client.get(self.url, {'limit': 5})
+        self.assertEqual(
+            by_cursor.json()['results'], by_page.json()['results']
+        )
+
+    def test_invalid_cursors(self):
+        def encode(data):
+            return base64.urlsafe_b64encode(data).decode()
+
+        recipe = Recipe.objects.first()
+        created_at = recipe.created_at.isoformat()
+        for cursor in (
+            'not a cursor',
+            encode(b'not json'),
+            encode(b'\xff\xfe'),
+            encode(b'null'),
+            encode(b'{}'),
+            encode(f'["{created_at}"]'.encode()),
+            encode(f'["{created_at}", "{recipe.pk}", "1"]'.encode()),
+            encode(f'["yesterday", "{recipe.pk}"]'.encode()),
+            encode(f'["{created_at}", "first"]'.encode()),
+        ):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(self.url, {'cursor': cursor})
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(
+                    response.json(), {'detail': 'Invalid cursor.'}
+                )
+
+
+@unittest.skipUnless(
+    os.environ.get('FOODGRAM_BENCHMARKS'),
+    'set FOODGRAM_BENCHMARKS=1 to run the benchmarks',
+)
+class KeysetPaginationBenchmark(FoodgramTestCase):
+    recipes_count = 20_000
+    page_size = 6
+    rounds = 50
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        author = cls.create_user('author')
+        now = timezone.now()
+        Recipe.objects.bulk_create(
+            [
+                Recipe(
+                    author=author,
+                    name=str(number),
+                    text='Текст рецепта',
+                    image='recipe.png',
+                    cooking_time=5,
+                    created_at=now - timedelta(seconds=number),
+                )
+                for number in range(cls.recipes_count)
+            ],
+            batch_size=1000,
+        )
+
+    def measure(self, pagination_class, params):
+        request = Request(APIRequestFactory().get('/', params))
+        queryset = Recipe.objects.all()
+        started = time.perf_counter()
+        for _ in range(self.rounds):
+            page = pagination_class().paginate_queryset(queryset, request)
+        elapsed = time.perf_counter() - started
+        return page, self.rounds / elapsed
+
+    def test_keyset_is_faster_on_deep_pages(self):
+        number = self.recipes_count // self.page_size - 1
+        start = (number - 1) * self.page_size
+        previous = Recipe.objects.all()[start - 1]
+        pagination = KeysetPagination()
+        cursor = pagination.encode_cursor(pagination.get_position(previous))
+        offset_page, offset = self.measure(
+            CachedCountPagination,
+            {'page': number, 'limit': self.page_size},
+        )
+        keyset_page, keyset = self.measure(
+            KeysetPagination, {'cursor': cursor, 'limit': self.page_size}
+        )
+        self.assertEqual(keyset_page, list(offset_page))
+        print(
+            f'\npages/s at page {number}: offset {offset:.0f}, '
+            f'keyset {keyset:.0f} (x{keyset / offset:.1f})'
+        )
+        self.assertGreater(keyset, offset)
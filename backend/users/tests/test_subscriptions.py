@@ -0,0 +1,180 @@
+from types import SimpleNamespace
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.tests.base import FoodgramTestCase
+from users.caches import SubscriptionResolver
+from users.models import Follow
+
+
+class SubscriptionsListTests(FoodgramTestCase):
+    url = '/api/users/subscriptions/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.follower = cls.create_user('follower')
+        for number in range(25):
+            author = cls.create_user(f'author{number}')
+            for recipe_number in range(number % 5):
+                cls.create_recipe(author, name=f'{number}-{recipe_number}')
+            Follow.objects.create(follower=cls.follower, follow_to=author)
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.client_for(self.follower)
+
+    def get(self, **params):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(context)
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        for params in ({}, {'recipes_limit': 2}, {'recipes_limit': 0}):
+            with self.subTest(**params):
+                counts = {
+                    self.get(limit=limit, **params)[1] for limit in (1, 5, 20)
+                }
+                self.assertEqual(len(counts), 1, counts)
+
+    def test_recipes_are_limited_per_author(self):
+        data, _ = self.get(limit=20, recipes_limit=2)
+        self.assertEqual(data['count'], 25)
+        self.assertEqual(len(data['results']), 20)
+        for author in data['results']:
+            number = int(author['username'].removeprefix('author'))
+            self.assertEqual(author['recipes_count'], number % 5)
+            self.assertEqual(len(author['recipes']), min(number % 5, 2))
+            self.assertTrue(author['is_subscribed'])
+
+    def test_latest_recipes_are_shown(self):
+        data, _ = self.get(limit=25, recipes_limit=1)
+        author = next(
+            author
+            for author in data['results']
+            if author['username'] == 'author4'
+        )
+        self.assertEqual(
+            [recipe['name'] for recipe in author['recipes']], ['4-3']
+        )
+
+    def test_invalid_recipes_limit(self):
+        response = self.client.get(self.url, {'recipes_limit': 'x'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('recipes_limit', response.json())
+
+
+class FollowToggleTests(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.follower = self.create_user('follower')
+        self.author = self.create_user('author')
+        self.create_recipe(self.author)
+        self.client = self.client_for(self.follower)
+        self.url = f'/api/users/{self.author.pk}/subscribe/'
+
+    def test_follow_and_unfollow(self):
+        # The author lookup, the INSERT, the counter and the recipes.
+        with self.assert_num_statements(4):
+            response = self.client.post(self.url)
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.json()['is_subscribed'])
+        self.assertEqual(response.json()['recipes_count'], 1)
+        with self.assert_num_statements(2):
+            response = self.client.post(self.url)
+        self.assertEqual(response.status_code, 400)
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.followers_count, 1)
+
+        with self.assert_num_statements(2):
+            response = self.client.delete(self.url)
+        self.assertEqual(response.status_code, 204)
+        with self.assert_num_statements(2):
+            response = self.client.delete(self.url)
+        self.assertEqual(response.status_code, 400)
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.followers_count, 0)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_followed_ids_are_invalidated(self):
+        profile_url = f'/api/users/{self.author.pk}/'
+        self.assertFalse(self.client.get(profile_url).json()['is_subscribed'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.url)
+        self.assertTrue(self.client.get(profile_url).json()['is_subscribed'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(self.url)
+        self.assertFalse(self.client.get(profile_url).json()['is_subscribed'])
+
+    def test_self_follow_and_missing_user(self):
+        url = f'/api/users/{self.follower.pk}/subscribe/'
+        self.assertEqual(self.client.post(url).status_code, 400)
+        missing_url = f'/api/users/{self.author.pk + 1}/subscribe/'
+        self.assertEqual(self.client.post(missing_url).status_code, 404)
+        self.assertEqual(self.client.delete(missing_url).status_code, 404)
+
+
+class SubscriptionResolverTests(FoodgramTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.reader = cls.create_user('reader')
+        cls.authors = [
+            cls.create_user(f'author{number}') for number in range(6)
+        ]
+        for author in cls.authors:
+            cls.create_recipe(author, name=author.username)
+        for author in cls.authors[::2]:
+            Follow.objects.create(follower=cls.reader, follow_to=author)
+
+    def test_followed_ids_are_loaded_once(self):
+        request = SimpleNamespace(user=self.reader)
+        resolver = SubscriptionResolver.for_request(request)
+        with self.assertNumQueries(1):
+            subscribed = [
+                resolver.is_subscribed(author.pk) for author in self.authors
+            ]
+        self.assertEqual(subscribed, [True, False] * 3)
+        self.assertIs(SubscriptionResolver.for_request(request), resolver)
+        # Another request reads the cached ids.
+        resolver = SubscriptionResolver.for_request(
+            SimpleNamespace(user=self.reader)
+        )
+        with self.assertNumQueries(0):
+            self.assertTrue(resolver.is_subscribed(self.authors[0].pk))
+
+    def test_anonymous_user(self):
+        resolver = SubscriptionResolver.for_request(
+            SimpleNamespace(user=AnonymousUser())
+        )
+        with self.assertNumQueries(0):
+            self.assertFalse(resolver.is_subscribed(self.authors[0].pk))
+
+    def test_reset_and_user_change(self):
+        request = SimpleNamespace(user=self.reader)
+        resolver = SubscriptionResolver.for_request(request)
+        SubscriptionResolver.reset(request)
+        self.assertIsNot(SubscriptionResolver.for_request(request), resolver)
+        resolver = SubscriptionResolver.for_request(request)
+        request.user = self.authors[1]
+        other = SubscriptionResolver.for_request(request)
+        self.assertIsNot(other, resolver)
+        self.assertFalse(other.is_subscribed(self.authors[0].pk))
+
+    def test_recipe_list(self):
+        client = self.client_for(self.reader)
+        counts = set()
+        for limit in (2, 6):
+            cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                response = client.get('/api/recipes/', {'limit': limit})
+            counts.add(len(context))
+            for recipe in response.json()['results']:
+                author = recipe['author']
+                number = int(author['username'].removeprefix('author'))
+                self.assertEqual(author['is_subscribed'], number % 2 == 0)
+        self.assertEqual(len(counts), 1, counts)
@@ -1,22 +1,38 @@
+from functools import partial
+
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from django.http import Http404
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet as DjoserUserViewSet
-from rest_framework import exceptions, generics, mixins, permissions
+from rest_framework import exceptions, generics, permissions, status
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
 
+from .caches import SubscriptionResolver
 from .models import Follow
-from .paginations import PageNumberLimitPagination
-from .serializers import FollowSerializer, FollowToSerializer
-from .services import clean_recipe_limit_param
+from .paginations import CachedCountPagination
+from .serializers import FollowToSerializer
+from .services import (
+    clean_recipe_limit_param,
+    delete_matching,
+    insert_or_ignore,
+    update_counter,
+)
+from .signals import FOLLOW_GENERATION
+from recipes.caches import USERS_GENERATION, bump_generation
+from recipes.mixins import AnonymousCachedResponseMixin
+from recipes.models import Recipe
 
 User = get_user_model()
 
 
-class UserViewSet(DjoserUserViewSet):
+class UserViewSet(AnonymousCachedResponseMixin, DjoserUserViewSet):
     """Djoser view set for User model."""
 
-    pagination_class = PageNumberLimitPagination
+    pagination_class = CachedCountPagination
+    cache_generation = USERS_GENERATION
 
     def get_queryset(self):
         qs = super().get_queryset()
@@ -28,33 +44,66 @@ class FollowToListView(generics.ListAPIView):
 
     serializer_class = FollowToSerializer
     permission_classes = (permissions.IsAuthenticated,)
-    pagination_class = PageNumberLimitPagination
+    pagination_class = CachedCountPagination
+    # The count is per follower and cheap, while a stale value shows up
+    # right after subscribing.
+    count_cache_timeout = 0
 
     def get(self, request, *args, **kwargs):
         clean_recipe_limit_param(request)
         return super().get(request, *args, **kwargs)
 
     def get_queryset(self):
-        return (
-            User.objects.prefetch_related('recipes')
-            .filter(follow_to__follower_id=self.request.user.id)
-            .order_by('-follow_to__created_at')
+        return User.objects.filter(
+            follow_to__follower_id=self.request.user.id
+        ).order_by('-follow_to__created_at')
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        authors = list(queryset) if page is None else page
+        prefetch_related_objects(authors, self.get_recipes_prefetch(authors))
+
+        serializer = self.get_serializer(authors, many=True)
+        if page is None:
+            return Response(serializer.data)
+        return self.get_paginated_response(serializer.data)
+
+    def get_recipes_prefetch(self, authors):
+        """
+        Prefetch only the recipes which will be shown, i.e. at most
+        `recipes_limit` latest recipes per author.
+        """
+        limit = self.request.GET.get('recipes_limit')
+        queryset = Recipe.objects.all()
+        if limit is not None:
+            queryset = Recipe.objects.limit_per_author(
+                limit, [author.pk for author in authors]
+            )
+        return Prefetch(
+            'recipes', queryset=queryset, to_attr='prefetched_recipes'
         )
 
 
-class FollowView(
-    mixins.CreateModelMixin, mixins.DestroyModelMixin, generics.GenericAPIView
-):
-    """Create/destroy view for Follow model."""
+class FollowView(generics.GenericAPIView):
+    """
+    Create/destroy view for Follow model.
+
+    Like the favorite and shopping cart toggles, following is a single
+    `INSERT ... ON CONFLICT DO NOTHING` and unfollowing a single `DELETE`,
+    with the followers counter and the follow generation updated here.
+    """
 
-    serializer_class = FollowSerializer
+    serializer_class = FollowToSerializer
     permission_classes = (permissions.IsAuthenticated,)
-    lookup_field = 'follow_to_id'
-    error_messages = {'not_follower': 'You are not a follower.'}
+    error_messages = {
+        'already_follower': 'You are already a follower.',
+        'not_follower': 'You are not a follower.',
+        'self_follow': 'You cannot follow to yourself.',
+    }
 
     def post(self, request, *args, **kwargs):
         clean_recipe_limit_param(request)
-        request.data['follow_to'] = kwargs['follow_to_id']
         return self.create(request, *args, **kwargs)
 
     def delete(self, request, *args, **kwargs):
@@ -68,24 +117,44 @@ class FollowView(
             User.objects.all(),
             pk=kwargs['follow_to_id'],
         )
-        response = super().create(request, *args, **kwargs)
-        repr_serializer = FollowToSerializer(
+        if follow_to.pk == request.user.id:
+            self.fail('self_follow')
+        with transaction.atomic():
+            inserted = insert_or_ignore(
+                Follow, follower_id=request.user.id, follow_to_id=follow_to.pk
+            )
+            if not inserted:
+                self.fail('already_follower')
+            self.follows_changed(follow_to.pk, 1)
+        serializer = FollowToSerializer(
             follow_to, context=self.get_serializer_context()
         )
-        response.data = repr_serializer.data
-        return response
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def destroy(self, request, *args, **kwargs):
-        try:
-            return super().destroy(request, *args, **kwargs)
-        except Http404 as exc:
-            pk = kwargs['follow_to_id']
-            if User.objects.filter(pk=pk).exists():
-                raise exceptions.ValidationError(
-                    {
-                        api_settings.NON_FIELD_ERRORS_KEY: [
-                            self.error_messages['not_follower']
-                        ]
-                    }
-                )
-            raise exc
+        pk = kwargs['follow_to_id']
+        with transaction.atomic():
+            deleted = delete_matching(
+                Follow, follower_id=request.user.id, follow_to_id=pk
+            )
+            if deleted:
+                self.follows_changed(pk, -1)
+        if deleted:
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        if User.objects.filter(pk=pk).exists():
+            self.fail('not_follower')
+        raise Http404
+
+    def follows_changed(self, follow_to_id, delta):
+        """Account for `follow_to_id` followed (1) or unfollowed (-1)."""
+        follower_id = self.request.user.id
+        update_counter(User, follow_to_id, 'followers_count', delta)
+        transaction.on_commit(
+            partial(bump_generation, FOLLOW_GENERATION.format(follower_id))
+        )
+        SubscriptionResolver.reset(self.request)
+
+    def fail(self, key):
+        raise exceptions.ValidationError(
+            {api_settings.NON_FIELD_ERRORS_KEY: [self.error_messages[key]]}
+        )